@@ -0,0 +1,61 @@
+"""Motor síncrono frente al motor asyncio con orígenes lentos
+
+Levanta el servidor de fixtures con latencia artificial y pide N URLs
+distintas (la misma página con un parámetro diferente para que no se
+coalescan ni se sirvan de la caché) primero con WebScraper.scrape_batch
+(hilos) y después con AsyncWebScraper.scrape_batch (un único loop), y
+muestra el tiempo total de cada motor y si los resultados coinciden.
+
+Uso: python benchmarks/bench_async.py [--urls N] [--latency MS] [--page NOMBRE]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper_api import BATCH_MAX_WORKERS, DomainProfiles, WebScraper  # noqa: E402
+from scraper_async import AsyncWebScraper  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+
+async def run_async(engine, urls):
+    try:
+        return await engine.scrape_batch(urls, use_cache=False)
+    finally:
+        await engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--urls', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=300.0, help='latencia del origen en milisegundos')
+    parser.add_argument('--page', default='link_list')
+    args = parser.parse_args()
+
+    with FixtureServer(latency=args.latency / 1000) as server:
+        urls = [server.url(args.page, n=index) for index in range(args.urls)]
+        print(f"{len(urls)} URLs de /{args.page} con {args.latency:.0f} ms de latencia")
+
+        # Todas las URLs van al mismo host: sin límite por host más allá del pool de hilos
+        scraper = WebScraper(per_host_limit=BATCH_MAX_WORKERS, profiles=DomainProfiles(path=None))
+        start = time.perf_counter()
+        sync_results = scraper.scrape_batch(urls, use_cache=False)
+        sync_time = time.perf_counter() - start
+        print(f"{'síncrono (hilos)':<20}{sync_time:>8.2f} s  ({len(urls) / sync_time:.1f} URLs/s)")
+
+        engine = AsyncWebScraper(WebScraper(profiles=DomainProfiles(path=None)), per_host_limit=0)
+        start = time.perf_counter()
+        async_results = asyncio.run(run_async(engine, urls))
+        async_time = time.perf_counter() - start
+        print(f"{'asyncio':<20}{async_time:>8.2f} s  ({len(urls) / async_time:.1f} URLs/s)")
+
+    parity = [r.get('data') for r in sync_results] == [r.get('data') for r in async_results]
+    print(f"paridad de resultados: {'ok' if parity else 'DISTINTA'}")
+    return 0 if parity else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Benchmark y comprobación de paridad de WebScraper.clean_soup
+
+Compara la limpieza en un solo recorrido con la implementación anterior
+(varias pasadas de find_all más get_text por etiqueta) sobre el corpus de
+prueba: el árbol resultante debe ser idéntico y se informa del tiempo de
+cada versión.
+
+Uso: python benchmarks/bench_clean_soup.py [--repeat N] [--scale N]
+"""
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup, Comment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper_api import WebScraper  # noqa: E402
+from corpus import build_corpus  # noqa: E402
+
+
+def legacy_clean_soup(scraper, soup):
+    """Implementación original de clean_soup, usada como referencia"""
+    for tag_name in scraper.UNWANTED_TAGS:
+        for tag in soup.find_all(tag_name):
+            tag.decompose()
+
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+
+    for tag in soup.find_all():
+        if tag.name == 'a' and tag.get('href'):
+            tag.attrs = {'href': tag['href']}
+        else:
+            tag.attrs = {}
+
+    for tag in soup.find_all():
+        text_content = tag.get_text(strip=True)
+        if not text_content or scraper.contains_css_like_content(text_content):
+            tag.decompose()
+
+    return soup
+
+
+def best_time(func, html, repeat):
+    """Mejor tiempo de `repeat` ejecuciones (el parseo no se cronometra)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        soup = BeautifulSoup(html, 'html.parser')
+        start = time.perf_counter()
+        result = func(soup)
+        best = min(best, time.perf_counter() - start)
+    return best, str(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    scraper = WebScraper()
+    mismatches = 0
+
+    print(f"{'página':<16}{'KB':>8}{'anterior (ms)':>16}{'actual (ms)':>14}{'mejora':>9}  paridad")
+    for name, html in build_corpus(args.scale).items():
+        legacy_time, legacy_tree = best_time(lambda soup: legacy_clean_soup(scraper, soup), html, args.repeat)
+        new_time, new_tree = best_time(scraper.clean_soup, html, args.repeat)
+        same = legacy_tree == new_tree
+        mismatches += not same
+        print(f"{name:<16}{len(html) / 1024:>8.0f}{legacy_time * 1000:>16.1f}{new_time * 1000:>14.1f}"
+              f"{legacy_time / new_time:>8.1f}x  {'ok' if same else 'DISTINTO'}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Micro-benchmark del detector de contenido CSS
+
+Recoge los textos que el scraper pasa realmente a contains_css_like_content
+al limpiar y extraer títulos del corpus de prueba, y mide sobre ellos la
+implementación anterior (15 llamadas a re.search por texto) frente al
+detector precompilado, en frío y con la caché caliente.
+
+Uso: python benchmarks/bench_css_detector.py [--repeat N] [--scale N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper_api  # noqa: E402
+from scraper_api import WebScraper  # noqa: E402
+from corpus import build_corpus  # noqa: E402
+
+
+def legacy_contains_css_like_content(text):
+    """Implementación original del detector, usada como referencia"""
+    text_lower = text.lower()
+    for pattern in scraper_api.CSS_PATTERNS:
+        if re.search(pattern, text_lower):
+            return True
+    if re.match(r'^[\d\s\-\.;:,px%emremvh]+$', text_lower):
+        return True
+    return False
+
+
+def collect_texts(scale):
+    """Textos que el scraper evalúa al procesar el corpus, en orden de llamada"""
+    scraper = WebScraper()
+    texts = []
+    detector = scraper.contains_css_like_content
+
+    def recording_detector(text):
+        texts.append(text)
+        return detector(text)
+
+    scraper.contains_css_like_content = recording_detector
+    for html in build_corpus(scale).values():
+        soup = scraper.clean_soup(BeautifulSoup(html, 'html.parser'))
+        for entry in soup.find_all(['article', 'li']):
+            scraper.get_best_title(entry)
+    return texts
+
+
+def timed(func, texts):
+    """Tiempo total de evaluar todos los textos y lista de veredictos"""
+    start = time.perf_counter()
+    verdicts = [func(text) for text in texts]
+    return time.perf_counter() - start, verdicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    texts = collect_texts(args.scale)
+    unique = len(set(texts))
+    print(f"{len(texts)} textos ({unique} distintos, {sum(map(len, texts)) / 1024:.0f} KB)")
+
+    legacy_time = min(timed(legacy_contains_css_like_content, texts)[0] for _ in range(args.repeat))
+    _, expected = timed(legacy_contains_css_like_content, texts)
+
+    uncached_time, verdicts = min(timed(scraper_api._detect_css, texts) for _ in range(args.repeat))
+    parity = verdicts == expected
+
+    detector = WebScraper().contains_css_like_content
+    cold_times = []
+    for _ in range(args.repeat):
+        scraper_api._detect_css_cached.cache_clear()
+        cold_times.append(timed(detector, texts)[0])
+    warm_time, verdicts = timed(detector, texts)
+    parity = parity and verdicts == expected
+
+    print(f"{'anterior':<28}{legacy_time * 1000:>10.2f} ms")
+    print(f"{'precompilado sin caché':<28}{uncached_time * 1000:>10.2f} ms  ({legacy_time / uncached_time:.1f}x)")
+    print(f"{'con caché (en frío)':<28}{min(cold_times) * 1000:>10.2f} ms  ({legacy_time / min(cold_times):.1f}x)")
+    print(f"{'con caché (caliente)':<28}{warm_time * 1000:>10.2f} ms  ({legacy_time / warm_time:.1f}x)")
+    print(f"paridad de veredictos: {'ok' if parity else 'DISTINTA'}")
+    print(scraper_api._detect_css_cached.cache_info())
+
+    return 0 if parity else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Comprobación del límite de tiempo total de la descarga
+
+Con un fetch_deadline corto, pide al servidor de fixtures una página que
+tarda más que el límite en responder y otra que siempre devuelve 503, con
+el scraper síncrono y con el asíncrono. Cada petición debe fallar dentro
+del límite (más un margen) y con el error que corresponde ("Timeout" o
+"Error HTTP", no un error inesperado); una página normal debe seguir
+funcionando.
+
+Uso: python benchmarks/bench_deadline.py [--deadline S] [--margin S]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper_api import DomainProfiles, WebScraper  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+try:
+    from scraper_async import AsyncWebScraper
+except ImportError:  # sin aiohttp
+    AsyncWebScraper = None
+
+
+def cases(server, deadline):
+    """(nombre, URL, prefijo esperado del error o None si debe funcionar)"""
+    return [
+        ('origen lento', server.url('portal_small', latency=int(deadline * 3000), n=1), 'Timeout'),
+        ('503 continuo', server.url('portal_small', status=503, n=2), 'Error HTTP: 503'),
+        ('página normal', server.url('portal_small', n=3), None),
+    ]
+
+
+def outcome(start, error):
+    return time.monotonic() - start, (str(error) if error is not None else None)
+
+
+def run_sync(scraper, url):
+    start = time.monotonic()
+    try:
+        scraper.scrape_website(url, use_cache=False)
+    except Exception as e:
+        return outcome(start, e)
+    return outcome(start, None)
+
+
+async def run_async(async_scraper, url):
+    start = time.monotonic()
+    try:
+        await async_scraper.scrape_website(url, {}, use_cache=False)
+    except Exception as e:
+        return outcome(start, e)
+    return outcome(start, None)
+
+
+async def run_all_async(scraper, urls):
+    async_scraper = AsyncWebScraper(scraper)
+    try:
+        return [await run_async(async_scraper, url) for url in urls]
+    finally:
+        await async_scraper.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--deadline', type=float, default=1.0, help='fetch_deadline en segundos')
+    parser.add_argument('--margin', type=float, default=0.5, help='tiempo tolerado sobre el límite')
+    args = parser.parse_args()
+
+    failures = 0
+    with FixtureServer() as server:
+        checks = cases(server, args.deadline)
+        scraper = WebScraper(fetch_deadline=args.deadline, extract_processes=0,
+                             profiles=DomainProfiles(path=None), store=False)
+        results = {'síncrono': [run_sync(scraper, url) for _, url, _ in checks]}
+        if AsyncWebScraper is not None:
+            results['asíncrono'] = asyncio.run(run_all_async(scraper, [url for _, url, _ in checks]))
+
+    print(f"{'scraper':<11}{'caso':<15}{'tiempo (s)':>11}  resultado")
+    for kind, outcomes in results.items():
+        for (name, _, expected), (elapsed, error) in zip(checks, outcomes):
+            ok = elapsed <= args.deadline + args.margin and (
+                error is None if expected is None else error is not None and error.startswith(expected))
+            failures += not ok
+            print(f"{kind:<11}{name:<15}{elapsed:>11.2f}  {error or 'ok'}{'' if ok else '  FALLO'}")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Benchmark y comprobación de paridad de la extracción heurística
+
+Compara WebScraper.extract_items con una implementación de referencia
+sencilla (get_text por elemento, sin caché de texto ni perfiles) sobre el
+corpus de prueba: los elementos extraídos deben ser idénticos y se informa
+del tiempo de cada versión. Como en la implementación actual, la referencia
+descarta las entradas que contienen a otra (los envoltorios de una sección
+con sus propias tarjetas) y se queda con las más internas.
+
+También comprueba que, una vez aprendido el perfil del dominio, la misma
+página da exactamente el mismo resultado que sin perfil.
+
+Uso: python benchmarks/bench_find_items.py [--repeat N] [--scale N] [--parser P]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper_api import DomainProfiles, WebScraper  # noqa: E402
+from corpus import build_corpus  # noqa: E402
+
+BASE_URL = 'https://diario.example.com/'
+
+
+def reference_entries(scraper, soup):
+    """Entradas más internas encontradas por los selectores candidatos, por orden de prioridad"""
+    matched = []
+    for selector in scraper.CANDIDATE_SELECTORS:
+        for node in soup.select(selector):
+            if all(node is not other for other, _ in matched):
+                matched.append((node, selector))
+        entries = [(node, selector) for node, selector in matched
+                   if not any(other is not node and node in other.parents for other, _ in matched)]
+        if len(entries) > 30:
+            break
+    return [node for node, _ in entries]
+
+
+def reference_items(scraper, html, url, parser):
+    """Extracción de referencia: mismo resultado que extract_items sin perfil aprendido"""
+    soup = scraper.clean_soup(BeautifulSoup(scraper.decode_content(html), parser))
+    data = []
+    entries = reference_entries(scraper, soup)
+
+    if not entries:
+        for container in soup.select(scraper.MAIN_CONTAINERS):
+            for link in container.find_all('a', href=True)[:20]:
+                title = scraper.extract_text_content(link)
+                full_url = urljoin(url, link['href']).strip()
+                if scraper.is_meaningful_title(title) and scraper.is_valid_url(full_url):
+                    data.append({"title": title, "link": full_url.split('#')[0]})
+        return scraper.dedupe_items(data)[:30]
+
+    for entry in entries:
+        title = scraper.get_best_title(entry)
+        link_element = entry.find('a', href=True)
+        if title and scraper.is_meaningful_title(title) and link_element:
+            link = urljoin(url, link_element['href']).strip().split('#')[0]
+            if scraper.is_valid_url(link):
+                data.append({"title": title, "link": link})
+    return scraper.dedupe_items(data)[:30]
+
+
+def cold_items(scraper, html):
+    """extract_items sin perfil aprendido para el dominio"""
+    scraper.profiles = DomainProfiles(path=None)
+    return scraper.extract_items(html, BASE_URL)
+
+
+def warm_items(scraper, html):
+    """extract_items con el perfil aprendido en una extracción anterior de la página"""
+    scraper.profiles = DomainProfiles(path=None)
+    scraper.extract_items(html, BASE_URL)
+    return scraper.extract_items(html, BASE_URL)
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--parser', default='html.parser')
+    args = parser.parse_args()
+
+    # Los feeds del corpus también pasan por la extracción heurística a propósito
+    warnings.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
+    mismatches = 0
+
+    print(f"{'página':<16}{'KB':>6}{'items':>7}{'referencia (ms)':>17}{'actual (ms)':>13}  paridad  con perfil")
+    for name, html in build_corpus(args.scale).items():
+        scraper = WebScraper(parser=args.parser, extract_processes=0, profiles=DomainProfiles(path=None),
+                             store=False)
+        reference_time, expected = best_time(lambda: reference_items(scraper, html, BASE_URL, args.parser),
+                                             args.repeat)
+        current_time, items = best_time(lambda: cold_items(scraper, html), args.repeat)
+        same = items == expected
+        same_warm = warm_items(scraper, html) == items
+        mismatches += (not same) + (not same_warm)
+        print(f"{name:<16}{len(html) / 1024:>6.0f}{len(items):>7}{reference_time * 1000:>17.1f}"
+              f"{current_time * 1000:>13.1f}  {'ok' if same else 'DISTINTO':<9}{'ok' if same_warm else 'DISTINTO'}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
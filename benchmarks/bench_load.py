@@ -0,0 +1,207 @@
+"""Prueba de carga de extremo a extremo contra el endpoint /scrape
+
+Levanta el servidor de fixtures como origen y el servicio Flask en un
+proceso aparte (con gunicorn si está instalado o con el servidor de
+werkzeug), y lanza peticiones /scrape desde N clientes concurrentes
+durante un tiempo o hasta un número de peticiones. Muestra las peticiones
+por segundo, las latencias p50/p95/p99, los códigos de estado y la memoria
+máxima (RSS) del proceso del servicio que más llegó a usar.
+
+Por defecto cada petición pide una URL distinta con cache=0, para medir la
+descarga y la extracción completas; con --cache se repiten las mismas
+páginas y se mide el camino de la caché. El servicio hereda las variables
+de entorno SCRAPER_*, así que el control de admisión, el pool de procesos,
+etc. se configuran igual que en producción.
+
+Uso: python benchmarks/bench_load.py [--concurrency N] [--duration S | --requests N]
+         [--pages P1,P2] [--latency MS] [--scale N] [--server gunicorn|werkzeug]
+         [--workers N] [--threads N] [--cache] [--json FICHERO]
+"""
+import argparse
+import importlib.util
+import itertools
+import math
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from fixture_server import FixtureServer
+from results import REPO_DIR, write_results
+
+WERKZEUG_COMMAND = (
+    "import sys; from werkzeug.serving import run_simple; import scraper_api; "
+    "run_simple('127.0.0.1', int(sys.argv[1]), scraper_api.app, threaded=True)"
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_service(server, port, workers, threads, log):
+    """Arranca el servicio en otro proceso y espera a que /health responda"""
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+                   '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'scraper_api:app']
+    else:
+        command = [sys.executable, '-c', WERKZEUG_COMMAND, str(port)]
+    process = subprocess.Popen(command, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=log)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/health', timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    log.seek(0)
+    raise RuntimeError(f"El servicio no arrancó:\n{log.read().decode('utf-8', 'replace')[-2000:]}")
+
+
+def stop_service(process):
+    """Para el servicio y devuelve el RSS máximo (MB) del proceso que más usó, si se puede medir"""
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    if resource is None:
+        return None
+    # ru_maxrss incluye a los workers de gunicorn: el máster los espera al terminar
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def percentile(values, fraction):
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+def run_load(service_url, target_urls, concurrency, total_requests, duration, use_cache):
+    """Lanza la carga y devuelve las latencias (s) de las peticiones, sus estados y la duración"""
+    counter = itertools.count()
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration if duration else None
+
+    def client():
+        session = requests.Session()
+        while True:
+            index = next(counter)
+            if (total_requests and index >= total_requests) or (stop_at and time.monotonic() >= stop_at):
+                return
+            params = {"url": target_urls[index % len(target_urls)], "cache": '1' if use_cache else '0'}
+            start = time.perf_counter()
+            try:
+                status = session.get(f'{service_url}/scrape', params=params, timeout=60).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20.0, help='segundos de carga (si no se indica --requests)')
+    parser.add_argument('--requests', type=int, default=0, help='número de peticiones en lugar de duración')
+    parser.add_argument('--warmup', type=int, default=20, help='peticiones previas que no se cuentan')
+    parser.add_argument('--pages', default='portal_small,portal_large,deep_nesting,noisy,portal_jsonld')
+    parser.add_argument('--latency', type=float, default=50.0, help='latencia del origen en milisegundos')
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--cache', action='store_true', help='repetir las mismas URLs con la caché activa')
+    parser.add_argument('--server', choices=('gunicorn', 'werkzeug'),
+                        default='gunicorn' if importlib.util.find_spec('gunicorn') else 'werkzeug')
+    parser.add_argument('--workers', type=int, default=2, help='workers de gunicorn')
+    parser.add_argument('--threads', type=int, default=16, help='hilos por worker de gunicorn')
+    parser.add_argument('--json', help='fichero donde guardar los resultados')
+    args = parser.parse_args()
+
+    pages = args.pages.split(',')
+    with FixtureServer(latency=args.latency / 1000, scale=args.scale) as origin, \
+            tempfile.TemporaryFile() as log:
+        unknown = [page for page in pages if page not in origin.pages()]
+        if unknown:
+            parser.error(f"páginas desconocidas: {', '.join(unknown)}")
+
+        # Sin caché, una URL distinta por petición para que tampoco se coalescan
+        count = len(pages) if args.cache else max(args.requests, 100000)
+        target_urls = [origin.url(pages[index % len(pages)], n=index) for index in range(count)]
+
+        port = free_port()
+        process = start_service(args.server, port, args.workers, args.threads, log)
+        service_url = f'http://127.0.0.1:{port}'
+        try:
+            if args.warmup:
+                run_load(service_url, target_urls[::-1], min(args.concurrency, args.warmup), args.warmup, None,
+                         args.cache)
+            latencies, statuses, elapsed = run_load(service_url, target_urls, args.concurrency, args.requests,
+                                                    None if args.requests else args.duration, args.cache)
+        finally:
+            peak_rss = stop_service(process)
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    metrics = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else None,
+        "latency_p50_ms": 1000 * percentile(latencies, 0.50) if latencies else None,
+        "latency_p95_ms": 1000 * percentile(latencies, 0.95) if latencies else None,
+        "latency_p99_ms": 1000 * percentile(latencies, 0.99) if latencies else None,
+        "latency_max_ms": 1000 * latencies[-1] if latencies else None,
+        "peak_rss_mb": peak_rss,
+    }
+
+    server = f"{args.server} ({args.workers}x{args.threads})" if args.server == 'gunicorn' else args.server
+    print(f"{server}, {args.concurrency} clientes, origen con {args.latency:.0f} ms, "
+          f"{'con' if args.cache else 'sin'} caché")
+    print(f"{metrics['requests']} peticiones en {elapsed:.1f} s: {metrics['rps']:.1f} req/s, {errors} errores")
+    if latencies:
+        print(f"latencia p50 {metrics['latency_p50_ms']:.0f} ms, p95 {metrics['latency_p95_ms']:.0f} ms, "
+              f"p99 {metrics['latency_p99_ms']:.0f} ms, máx {metrics['latency_max_ms']:.0f} ms")
+    print(f"estados: {dict(statuses)}")
+    if peak_rss is not None:
+        print(f"RSS máximo del servicio: {peak_rss:.0f} MB")
+
+    if args.json:
+        params = {name: getattr(args, name) for name in
+                  ('concurrency', 'duration', 'requests', 'pages', 'latency', 'scale', 'cache', 'server',
+                   'workers', 'threads')}
+        write_results(args.json, 'load', params, metrics, {"statuses": {str(k): v for k, v in statuses.items()}})
+    return 1 if errors and errors == len(latencies) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Comparación de los parsers de HTML disponibles
+
+Para cada página del corpus y cada parser instalado mide el tiempo de
+parseo, el tiempo total de extracción (parseo, limpieza y selección) y
+comprueba que los elementos extraídos coinciden con los de html.parser.
+
+Uso: python benchmarks/bench_parsers.py [--repeat N] [--scale N]
+"""
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper_api import AVAILABLE_PARSERS, PARSER_BACKENDS, WebScraper  # noqa: E402
+from corpus import build_corpus  # noqa: E402
+
+BASE_URL = 'https://diario.example.com/'
+
+
+def best_time(func, repeat):
+    """Mejor tiempo de `repeat` ejecuciones y resultado de la última"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    missing = [name for name in PARSER_BACKENDS if name not in AVAILABLE_PARSERS]
+    if missing:
+        print(f"No instalados (se omiten): {', '.join(missing)}")
+
+    scraper = WebScraper()
+    mismatches = 0
+
+    print(f"{'página':<16}{'parser':<13}{'parseo (ms)':>13}{'extracción (ms)':>17}{'items':>7}  paridad")
+    for name, html in build_corpus(args.scale).items():
+        reference = None
+        for backend in ('html.parser',) + tuple(p for p in AVAILABLE_PARSERS if p != 'html.parser'):
+            parse_time, _ = best_time(lambda: BeautifulSoup(html, backend), args.repeat)
+            extract_time, items = best_time(lambda: scraper.extract_items(html, BASE_URL, backend), args.repeat)
+
+            if reference is None:
+                reference = items
+                parity = 'referencia'
+            elif items == reference:
+                parity = 'ok'
+            else:
+                same_set = {(i['title'], i['link']) for i in items} == {(i['title'], i['link']) for i in reference}
+                parity = 'mismo conjunto' if same_set else 'DISTINTO'
+                mismatches += not same_set
+
+            print(f"{name:<16}{backend:<13}{parse_time * 1000:>13.1f}{extract_time * 1000:>17.1f}"
+                  f"{len(items):>7}  {parity}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Escalado de la extracción con el pool de procesos
+
+Simula varios hilos de petición (como los threads de gunicorn) extrayendo
+páginas del corpus a la vez, primero en el propio hilo (limitados por el
+GIL) y después delegando en pools de 1, 2, 4... procesos hasta el número
+de núcleos, y muestra las páginas por segundo de cada configuración.
+
+Uso: python benchmarks/bench_process_pool.py [--threads N] [--pages N] [--scale N]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper_api import DomainProfiles, WebScraper  # noqa: E402
+from corpus import build_corpus  # noqa: E402
+
+
+def process_counts(cpus):
+    """0 (sin pool) y potencias de dos hasta el número de núcleos"""
+    counts = [0]
+    count = 1
+    while count < cpus:
+        counts.append(count)
+        count *= 2
+    counts.append(cpus)
+    return counts
+
+
+def run(processes, jobs, threads):
+    """Extrae todas las páginas con `threads` hilos y devuelve páginas por segundo"""
+    scraper = WebScraper(profiles=DomainProfiles(path=None), extract_processes=processes)
+
+    # Arrancar los procesos del pool antes de medir
+    with ThreadPoolExecutor(max_workers=max(processes, 1)) as warmup:
+        list(warmup.map(lambda job: scraper.extract_items(*job), jobs[:max(processes, 1)]))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda job: scraper.extract_items(*job), jobs))
+    elapsed = time.perf_counter() - start
+
+    pool = scraper._get_extract_pool()
+    if pool is not None:
+        pool.shutdown()
+    return len(jobs) / elapsed, sum(len(items) for items in results)
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=max(4, cpus * 2))
+    parser.add_argument('--pages', type=int, default=120)
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = list(build_corpus(args.scale).items())
+    jobs = [
+        (html, f'https://{name}-{index}.example.com/')
+        for index, (name, html) in ((i, corpus[i % len(corpus)]) for i in range(args.pages))
+    ]
+
+    print(f"{cpus} núcleos, {args.threads} hilos de petición, {len(jobs)} páginas")
+    print(f"{'procesos':<12}{'páginas/s':>12}{'escalado':>10}{'items':>8}")
+
+    baseline = None
+    for processes in process_counts(cpus):
+        rate, total_items = run(processes, jobs, args.threads)
+        baseline = baseline or rate
+        label = 'sin pool' if processes == 0 else str(processes)
+        print(f"{label:<12}{rate:>12.1f}{rate / baseline:>9.2f}x{total_items:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Micro-benchmarks de cada etapa de WebScraper sobre el corpus
+
+Para cada página del corpus mide por separado la resolución del charset,
+la búsqueda de datos estructurados y cada etapa de la extracción
+heurística (decode, parse, links, clean, select, extract, dedupe) tal como
+las cronometra run_extraction, y muestra la mediana de `--repeat`
+ejecuciones en milisegundos. Con --json guarda las métricas
+("<página>.<etapa>_ms") para compararlas con benchmarks/compare.py.
+
+Uso: python benchmarks/bench_stages.py [--repeat N] [--scale N] [--parser P] [--json FICHERO]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+from bs4 import XMLParsedAsHTMLWarning
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper_api import DomainProfiles, WebScraper  # noqa: E402
+from corpus import build_corpus  # noqa: E402
+from results import write_results  # noqa: E402
+
+BASE_URL = 'https://diario.example.com/'
+
+STAGES = ('charset', 'structured', 'decode', 'parse', 'links', 'clean', 'select', 'extract', 'dedupe')
+
+
+def measure_page(scraper, html, parser):
+    """Duración en segundos de cada etapa para una pasada sobre una página"""
+    timings = {}
+
+    start = time.perf_counter()
+    encoding = scraper.resolve_encoding(html, BASE_URL)
+    timings['charset'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scraper.find_structured_items(html, BASE_URL)
+    timings['structured'] = time.perf_counter() - start
+
+    # Sin perfil aprendido: la búsqueda completa de selectores
+    scraper.run_extraction(html, BASE_URL, parser, timings, links=[], encoding=encoding)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--parser', default='html.parser')
+    parser.add_argument('--json', help='fichero donde guardar los resultados')
+    args = parser.parse_args()
+
+    # Los feeds del corpus también pasan por la extracción heurística a propósito
+    warnings.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
+    scraper = WebScraper(parser=args.parser, extract_processes=0, profiles=DomainProfiles(path=None), store=False)
+    corpus = build_corpus(args.scale)
+    metrics = {}
+
+    print(f"{'página':<16}{'KB':>6}" + ''.join(f"{stage:>11}" for stage in STAGES) + f"{'total':>10}")
+    for name, html in corpus.items():
+        runs = [measure_page(scraper, html, args.parser) for _ in range(args.repeat)]
+        medians = {stage: statistics.median(run.get(stage, 0.0) for run in runs) for stage in STAGES}
+        total = statistics.median(sum(run.values()) for run in runs)
+
+        for stage, seconds in medians.items():
+            metrics[f"{name}.{stage}_ms"] = seconds * 1000
+        metrics[f"{name}.total_ms"] = total * 1000
+        print(f"{name:<16}{len(html) / 1024:>6.0f}" + ''.join(f"{medians[stage] * 1000:>11.2f}" for stage in STAGES)
+              + f"{total * 1000:>10.1f}")
+
+    if args.json:
+        write_results(args.json, 'stages', {"repeat": args.repeat, "scale": args.scale, "parser": args.parser},
+                      metrics)
+
+
+if __name__ == '__main__':
+    main()
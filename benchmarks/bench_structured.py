@@ -0,0 +1,67 @@
+"""Extracción desde JSON-LD y feeds frente a la extracción heurística
+
+Para las páginas del corpus con datos estructurados mide el tiempo de la
+extracción heurística completa (decodificar, parsear, limpiar y buscar
+entradas) y el de la vía rápida: detectar la fuente en los bytes y leer el
+JSON-LD o el feed. En las portadas que solo anuncian un feed se cuenta el
+parseo del feed, no su descarga.
+
+Uso: python benchmarks/bench_structured.py [--repeat N] [--scale N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper_api import DomainProfiles, WebScraper  # noqa: E402
+from corpus import build_corpus  # noqa: E402
+
+BASE_URL = 'https://example.com/'
+
+# Página y, si la página solo anuncia su feed, el feed que hay que leer
+CASES = (
+    ('portal_jsonld', None),
+    ('portal_feed', 'feed_rss'),
+    ('feed_rss', None),
+    ('feed_atom', None),
+)
+
+
+def best_time(func, repeat):
+    """Mejor tiempo de `repeat` ejecuciones y resultado de la última"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.scale)
+    scraper = WebScraper(profiles=DomainProfiles(path=None))
+
+    def structured(name, feed):
+        items, source, feed_urls = scraper.find_structured_items(corpus[name], BASE_URL)
+        if feed and not items and feed_urls:
+            items, source = scraper.parse_feed(corpus[feed], feed_urls[0]), 'feed'
+        return items, source
+
+    print(f"{'página':<16}{'heurística (ms)':>17}{'estructurada (ms)':>19}{'mejora':>9}  fuente  items")
+    for name, feed in CASES:
+        heuristic_time, _ = best_time(lambda: scraper.extract_items(corpus[name], BASE_URL), args.repeat)
+        structured_time, (items, source) = best_time(lambda: structured(name, feed), args.repeat)
+        print(f"{name:<16}{heuristic_time * 1000:>17.1f}{structured_time * 1000:>19.2f}"
+              f"{heuristic_time / structured_time:>8.0f}x  {source or '-':<7}{len(items):>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compara dos ejecuciones de un benchmark y señala las regresiones
+
+Recibe dos ficheros generados con --json por el mismo benchmark y, para
+cada métrica común, muestra el valor anterior, el nuevo y el cambio. Una
+métrica es una regresión si empeora más del umbral (en tiempos y memoria,
+si sube; en peticiones por segundo, si baja). Las métricas en las que
+ambos valores quedan por debajo de --min-value se ignoran: en las etapas
+de microsegundos el ruido supera cualquier umbral.
+
+Uso: python benchmarks/compare.py ANTES.json DESPUES.json [--threshold 0.10] [--min-value 0.1] [--all]
+"""
+import argparse
+import sys
+
+from results import higher_is_better, load_results
+
+
+def compare(before, after, threshold, min_value=0.0):
+    """Filas (métrica, antes, después, cambio relativo, es_regresión) de las métricas comunes"""
+    rows = []
+    for metric in sorted(before.keys() & after.keys()):
+        old, new = before[metric], after[metric]
+        if max(abs(old), abs(new)) < min_value:
+            continue
+        if old == 0:
+            change = 0.0 if new == 0 else float('inf')
+        else:
+            change = (new - old) / abs(old)
+        worse = -change if higher_is_better(metric) else change
+        rows.append((metric, old, new, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.10, help='empeoramiento relativo tolerado')
+    parser.add_argument('--min-value', type=float, default=0.1, help='ignorar métricas menores que este valor')
+    parser.add_argument('--all', action='store_true', help='mostrar también las métricas sin regresión')
+    args = parser.parse_args()
+
+    before, after = load_results(args.before), load_results(args.after)
+    if before.get('benchmark') != after.get('benchmark'):
+        parser.error(f"benchmarks distintos: {before.get('benchmark')} y {after.get('benchmark')}")
+    if before.get('params') != after.get('params'):
+        print("aviso: los parámetros de las dos ejecuciones no coinciden", file=sys.stderr)
+
+    print(f"{before.get('benchmark')}: {before.get('commit') or '?'} -> {after.get('commit') or '?'}")
+    rows = compare(before['metrics'], after['metrics'], args.threshold, args.min_value)
+    regressions = [row for row in rows if row[4]]
+    for metric, old, new, change, regression in rows:
+        if regression or args.all:
+            print(f"{metric:<40}{old:>12.3f}{new:>12.3f}{change:>+9.1%}  {'REGRESIÓN' if regression else ''}")
+
+    print(f"{len(regressions)} regresiones de {len(rows)} métricas (umbral {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
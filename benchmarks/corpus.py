@@ -0,0 +1,242 @@
+"""Corpus de páginas de prueba para los benchmarks del scraper
+
+Genera de forma determinista portadas de noticias sintéticas con la
+estructura típica de los sitios que scrapeamos: cabecera y menú, bloques de
+artículos, listas de titulares, barras laterales, estilos y scripts en línea,
+comentarios, envoltorios profundamente anidados y entradas dentro de otras
+entradas. Incluye también portadas con datos estructurados (JSON-LD o un
+feed anunciado) y los propios feeds RSS y Atom.
+"""
+import json
+import random
+
+WORDS = (
+    "gobierno anuncia nuevas medidas economía mercado elecciones fútbol "
+    "partido ciudad tecnología ciencia salud mundo política cultura empresa "
+    "banco central inflación récord equipo campeonato región presidente "
+    "ministra acuerdo informe estudio investigación universidad clima lluvias "
+    "tráfico vivienda precios alquiler educación energía España México Chile"
+).split()
+
+INLINE_CSS = ".card{color:#333;margin:0 auto;padding:4px}@media (max-width:600px){.card{display:none}}"
+INLINE_JS = "window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments);}"
+
+
+def _sentence(rng, min_words=4, max_words=12):
+    """Genera una frase aleatoria con mayúscula inicial"""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return ' '.join(words).capitalize()
+
+
+def _wrap(html, depth):
+    """Envuelve un fragmento en `depth` divs anidados"""
+    for level in range(depth):
+        html = f'<div class="wrap-{level}">{html}</div>'
+    return html
+
+
+def _head(rng, title):
+    """Bloque <head> con metadatos, estilos y scripts en línea"""
+    return (
+        '<head><meta charset="utf-8">'
+        f'<title>{title}</title>'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        '<link rel="stylesheet" href="/static/main.css">'
+        f'<style>{INLINE_CSS}</style>'
+        f'<script>{INLINE_JS}</script>'
+        '</head>'
+    )
+
+
+def _header():
+    """Cabecera del sitio con menú de navegación y buscador"""
+    links = ''.join(f'<li><a href="/{name}">{name.capitalize()}</a></li>'
+                    for name in ('inicio', 'política', 'economía', 'deportes', 'cultura'))
+    return (
+        '<header class="site-header"><nav class="menu"><ul>' + links + '</ul></nav>'
+        '<form action="/buscar"><input type="text" name="q"><button>Buscar</button></form>'
+        '</header>'
+    )
+
+
+def _footer():
+    """Barra lateral y pie de página"""
+    return (
+        '<aside class="sidebar"><h3>Lo más leído</h3><ul>'
+        '<li><a href="/popular/1">Popular uno</a></li><li><a href="/popular/2">Popular dos</a></li>'
+        '</ul></aside>'
+        '<footer><p>© Diario de prueba</p><a href="/aviso-legal">Aviso legal</a></footer>'
+    )
+
+
+def _article_card(rng, index, depth):
+    """Tarjeta de artículo con imagen, titular, resumen y metadatos"""
+    title = _sentence(rng)
+    summary = _sentence(rng, 10, 25)
+    card = (
+        f'<article class="post card" data-id="{index}" style="padding:4px">'
+        f'<!-- tarjeta {index} -->'
+        f'<a href="/noticias/{index}?ref=home#top"><img src="/img/{index}.jpg" alt=""></a>'
+        f'<h2 class="title"><a href="/noticias/{index}?ref=home#top">{title}</a></h2>'
+        f'<p class="summary">{summary}</p>'
+        f'<span class="meta">Hace {rng.randint(1, 59)} minutos</span>'
+        '<svg viewBox="0 0 10 10"><path d="M0 0L10 10"></path></svg>'
+        '</article>'
+    )
+    return _wrap(card, depth)
+
+
+def _list_item(rng, index):
+    """Elemento de una lista de titulares de última hora"""
+    return (
+        f'<li class="item-news"><span class="time">{rng.randint(0, 23)}:{rng.randint(10, 59)}</span>'
+        f'<a href="https://example.com/ultima-hora/{index}">{_sentence(rng)}</a></li>'
+    )
+
+
+def news_portal(seed=0, cards=60, items=40, depth=3):
+    """Portada de un diario con tarjetas de artículos y una lista de última hora"""
+    rng = random.Random(seed)
+    body = [_header(), '<main id="main"><section class="grid">']
+    body.extend(_article_card(rng, index, depth) for index in range(cards))
+    body.append('</section><section class="latest"><h2>Última hora</h2><ul>')
+    body.extend(_list_item(rng, index) for index in range(items))
+    body.append('</ul></section></main>')
+    body.append(_footer())
+    return '<!DOCTYPE html><html lang="es">' + _head(rng, 'Portada') + '<body>' + ''.join(body) + '</body></html>'
+
+
+def link_list_page(seed=0, links=80):
+    """Página sin artículos: solo enlaces dentro del contenedor principal"""
+    rng = random.Random(seed)
+    anchors = ''.join(
+        f'<p><a href="/seccion/{index}">{_sentence(rng)}</a></p>' for index in range(links)
+    )
+    return (
+        '<!DOCTYPE html><html>' + _head(rng, 'Sección') + '<body>' + _header()
+        + f'<div id="content"><div class="listing">{anchors}</div></div>' + _footer()
+        + '</body></html>'
+    )
+
+
+def deep_nesting_page(seed=0, cards=30, depth=40):
+    """Página con envoltorios muy anidados alrededor de cada artículo"""
+    return news_portal(seed=seed, cards=cards, items=0, depth=depth)
+
+
+def nested_entries_page(seed=0, sections=4, teasers=10):
+    """Portada con secciones en <article> que envuelven a sus propias tarjetas <article>"""
+    rng = random.Random(seed)
+    body = [_header(), '<main id="main">']
+    for section in range(sections):
+        body.append(f'<article class="section"><h2>Sección {_sentence(rng, 1, 2)}</h2>')
+        for teaser in range(teasers):
+            index = section * teasers + teaser
+            body.append(
+                f'<article class="teaser"><h3><a href="/noticias/{index}">{_sentence(rng)}</a></h3>'
+                f'<p>{_sentence(rng, 10, 20)}</p></article>'
+            )
+        body.append(f'<a href="/secciones/{section}">Ver toda la sección</a></article>')
+    body.append('</main>')
+    body.append(_footer())
+    return '<!DOCTYPE html><html lang="es">' + _head(rng, 'Secciones') + '<body>' + ''.join(body) + '</body></html>'
+
+
+def noisy_page(seed=0, cards=40):
+    """Página con ruido: plantillas, comentarios, bloques vacíos y números sueltos"""
+    rng = random.Random(seed)
+    blocks = []
+    for index in range(cards):
+        blocks.append(_article_card(rng, index, 1))
+        if index % 5 == 0:
+            blocks.append(f'<div class="ad"><span>{rng.randint(1, 99)}</span><!-- anuncio --></div>')
+        if index % 7 == 0:
+            blocks.append('<div class="spacer"><span> </span><div>  </div></div>')
+        if index % 9 == 0:
+            blocks.append(f'<template><p>{_sentence(rng)}</p></template>')
+    return (
+        '<!DOCTYPE html><html>' + _head(rng, 'Ruido') + '<body>' + _header()
+        + '<main>' + ''.join(blocks) + '</main>' + _footer() + '</body></html>'
+    )
+
+
+def css_leak_page(seed=0, cards=20):
+    """Página con CSS filtrado como texto visible dentro del contenido"""
+    rng = random.Random(seed)
+    blocks = [_article_card(rng, index, 2) for index in range(cards)]
+    blocks.insert(cards // 2, f'<div class="ad"><p>{INLINE_CSS}</p></div>')
+    blocks.append(f'<div><p>width: {rng.randint(10, 900)}px; height: 20px</p><p>12.5 - 3px</p></div>')
+    return (
+        '<!DOCTYPE html><html>' + _head(rng, 'CSS') + '<body>'
+        + '<main>' + ''.join(blocks) + '</main></body></html>'
+    )
+
+
+def _headlines(seed, count):
+    """Titulares y rutas de artículos, iguales en la portada y en sus datos estructurados"""
+    rng = random.Random(seed)
+    return [(_sentence(rng), f'/noticias/{index}') for index in range(count)]
+
+
+def jsonld_portal(seed=0, cards=60):
+    """Portada con un ItemList en JSON-LD con los mismos titulares que las tarjetas"""
+    headlines = _headlines(seed, cards)
+    data = {
+        "@context": "https://schema.org",
+        "@type": "ItemList",
+        "itemListElement": [
+            {"@type": "ListItem", "position": index + 1,
+             "item": {"@type": "NewsArticle", "headline": title, "url": f"https://example.com{path}"}}
+            for index, (title, path) in enumerate(headlines)
+        ],
+    }
+    page = news_portal(seed=seed, cards=cards, items=cards // 2)
+    script = f'<script type="application/ld+json">{json.dumps(data, ensure_ascii=False)}</script>'
+    return page.replace('</head>', script + '</head>', 1)
+
+
+def feed_portal(seed=0, cards=60, feed='/feed_rss'):
+    """Portada que anuncia su feed RSS con <link rel="alternate">"""
+    page = news_portal(seed=seed, cards=cards, items=cards // 2)
+    link = f'<link rel="alternate" type="application/rss+xml" title="Portada" href="{feed}">'
+    return page.replace('</head>', link + '</head>', 1)
+
+
+def rss_feed(seed=0, items=50):
+    """Feed RSS 2.0 con titulares"""
+    entries = ''.join(
+        f'<item><title>{title}</title><link>https://example.com{path}</link>'
+        f'<description><![CDATA[<p>{title}</p>]]></description></item>'
+        for title, path in _headlines(seed, items)
+    )
+    return ('<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f'<title>Diario</title><link>https://example.com/</link>{entries}</channel></rss>')
+
+
+def atom_feed(seed=0, items=50):
+    """Feed Atom con titulares"""
+    entries = ''.join(
+        f'<entry><title type="html">{title}</title><link rel="alternate" href="{path}"/>'
+        f'<id>tag:example.com,2024:{path}</id></entry>'
+        for title, path in _headlines(seed, items)
+    )
+    return ('<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+            f'<title>Diario</title>{entries}</feed>')
+
+
+def build_corpus(scale=1):
+    """Devuelve un diccionario nombre -> HTML (bytes) con todas las páginas del corpus"""
+    pages = {
+        'portal_small': news_portal(seed=1, cards=20 * scale, items=10 * scale),
+        'portal_large': news_portal(seed=2, cards=300 * scale, items=200 * scale),
+        'link_list': link_list_page(seed=3, links=80 * scale),
+        'deep_nesting': deep_nesting_page(seed=4, cards=30 * scale),
+        'nested_entries': nested_entries_page(seed=10, sections=3 * scale),
+        'noisy': noisy_page(seed=5, cards=40 * scale),
+        'css_leak': css_leak_page(seed=6, cards=20 * scale),
+        'portal_jsonld': jsonld_portal(seed=7, cards=60 * scale),
+        'portal_feed': feed_portal(seed=8, cards=60 * scale),
+        'feed_rss': rss_feed(seed=8, items=50 * scale),
+        'feed_atom': atom_feed(seed=9, items=50 * scale),
+    }
+    return {name: html.encode('utf-8') for name, html in pages.items()}
@@ -0,0 +1,178 @@
+"""Servidor HTTP local que sirve el corpus de prueba con latencia artificial
+
+Hace de origen de sustitución para los benchmarks: no necesita red y
+aguanta miles de conexiones lentas a la vez porque está escrito sobre
+asyncio. Cada página del corpus se sirve en
+
+    GET /<página>?latency=<ms>&scale=<n>&status=<código>
+
+donde `latency` (milisegundos) y `scale` (tamaño del corpus) son opcionales
+y sobrescriben los valores por defecto del servidor, y `status` hace que
+responda con ese código de error en lugar de la página. Cualquier otro
+parámetro se ignora, lo que permite pedir la misma página con URLs
+distintas. Responde con ETag y honra If-None-Match con un 304.
+
+Uso como script: python benchmarks/fixture_server.py [--port N] [--latency MS] [--scale N]
+Uso desde código:
+
+    with FixtureServer(latency=0.2) as server:
+        url = server.url('portal_small')
+"""
+import argparse
+import asyncio
+import hashlib
+import threading
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from corpus import build_corpus
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 404: 'Not Found', 500: 'Internal Server Error',
+               502: 'Bad Gateway', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class FixtureServer:
+    """Servidor asyncio en un hilo propio que sirve las páginas del corpus"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, scale=1):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.scale = scale
+        self.requests_served = 0
+        self._corpora = {}
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def pages(self, scale=None):
+        """Páginas del corpus (con su ETag) para una escala dada"""
+        scale = scale or self.scale
+        if scale not in self._corpora:
+            self._corpora[scale] = {
+                name: (html, '"%s"' % hashlib.sha1(html).hexdigest()[:16])
+                for name, html in build_corpus(scale).items()
+            }
+        return self._corpora[scale]
+
+    def url(self, page, **params):
+        query = f'?{urlencode(params)}' if params else ''
+        return f'http://{self.host}:{self.port}/{page}{query}'
+
+    def start(self):
+        self.pages()
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, backlog=4096))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+            # Cerrar las conexiones que sigan abiertas antes de cerrar el loop
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name='fixture-server', daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    async def _handle(self, reader, writer):
+        """Atiende las peticiones de una conexión (con keep-alive)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                _, target, _ = request_line.decode('latin-1').split(' ', 2)
+                status, body, extra_headers = await self._respond(target, headers)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+
+                head = [
+                    f'HTTP/1.1 {status} {STATUS_TEXT[status]}',
+                    'Content-Type: text/html; charset=utf-8',
+                    f'Content-Length: {len(body)}',
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ] + extra_headers
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                self.requests_served += 1
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, target, headers):
+        """Estado, cuerpo y cabeceras adicionales para una ruta"""
+        parts = urlsplit(target)
+        query = parse_qs(parts.query)
+        latency = float(query['latency'][0]) / 1000 if 'latency' in query else self.latency
+        scale = int(query['scale'][0]) if 'scale' in query else None
+
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+        status = int(query['status'][0]) if 'status' in query else 200
+        if status in STATUS_TEXT and status >= 500:
+            return status, b'<html><body>Error</body></html>', []
+
+        page = self.pages(scale).get(parts.path.strip('/'))
+        if page is None:
+            return 404, b'<html><body>No encontrado</body></html>', []
+
+        html, etag = page
+        if headers.get('if-none-match') == etag:
+            return 304, b'', [f'ETag: {etag}']
+        return 200, html, [f'ETag: {etag}']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency', type=float, default=0.0, help='latencia por defecto en milisegundos')
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    server = FixtureServer(args.host, args.port, args.latency / 1000, args.scale).start()
+    print(f"Sirviendo {', '.join(server.pages())} en http://{args.host}:{server.port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
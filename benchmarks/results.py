@@ -0,0 +1,58 @@
+"""Resultados de los benchmarks en JSON, para comparar una ejecución con otra
+
+Los benchmarks que aceptan --json guardan un fichero con el entorno
+(commit, Python, plataforma y CPUs), los parámetros de la ejecución y un
+diccionario plano de métricas numéricas. benchmarks/compare.py compara dos
+de esos ficheros y señala las métricas que empeoran.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Métricas en las que un valor más alto es mejor; en el resto (tiempos,
+# memoria, errores) es mejor un valor más bajo
+HIGHER_IS_BETTER_SUFFIXES = ('_per_s', 'rps', 'requests')
+
+
+def higher_is_better(metric):
+    return metric.endswith(HIGHER_IS_BETTER_SUFFIXES)
+
+
+def environment():
+    """Datos de la máquina y del código con que se ejecutó el benchmark"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path, benchmark, params, metrics, extra=None):
+    """Guarda los resultados de una ejecución en `path`"""
+    data = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        **environment(),
+        "params": params,
+        "metrics": {name: round(value, 4) for name, value in metrics.items() if value is not None},
+    }
+    if extra:
+        data.update(extra)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
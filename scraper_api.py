@@ -1,367 +1,1800 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import requests
-from bs4 import BeautifulSoup, Comment
-from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup, Comment, Tag, UnicodeDammit
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+import atexit
+import codecs
+import contextvars
+import gzip
+import hashlib
+import heapq
+import html
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import random
 import re
+import sqlite3
 import time
+import threading
+import tracemalloc
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
 from urllib3.util.retry import Retry
+from werkzeug.http import parse_accept_header
+from xml.etree import ElementTree
+
+# Brotli es opcional: sin él las respuestas se comprimen solo con gzip
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
 
 app = Flask(__name__)
 
-class WebScraper:
-    def __init__(self):
-        self.session = requests.Session()
+# Tipos de cadena que BeautifulSoup considera texto visible por defecto
+MAIN_CONTENT_STRING_TYPES = Tag.MAIN_CONTENT_STRING_TYPES
+
+# Patrones que delatan CSS dentro del texto
+CSS_PATTERNS = [
+    r'{\s*[^}]*:\s*[^}]*}',  # CSS rules
+    r'@media\s+',            # Media queries
+    r'\.[\w-]+\s*{',         # CSS classes
+    r'#[\w-]+\s*{',          # CSS IDs
+    r':\s*\d+px',            # CSS pixels
+    r'color\s*:\s*#?[a-fA-F0-9]+',  # Colors
+    r'font-size\s*:',        # Font properties
+    r'margin\s*:',           # Margin
+    r'padding\s*:',          # Padding
+    r'display\s*:',          # Display
+    r'position\s*:',         # Position
+    r'background\s*:',       # Background
+    r'border\s*:',           # Border
+    r'width\s*:\s*\d+',      # Width
+    r'height\s*:\s*\d+',     # Height
+]
+
+# Todos los patrones compilados en una sola alternancia al importar el módulo
+CSS_REGEX = re.compile('|'.join(f'(?:{pattern})' for pattern in CSS_PATTERNS))
+
+# Si es solo números, guiones, puntos y espacios (típico de CSS)
+CSS_VALUES_REGEX = re.compile(r'^[\d\s\-\.;:,px%emremvh]+$')
+
+# Tamaño de la caché de veredictos y longitud máxima de los textos cacheados
+CSS_CACHE_SIZE = int(os.environ.get('SCRAPER_CSS_CACHE_SIZE', '8192'))
+CSS_CACHE_MAX_LENGTH = 1024
+
+def _detect_css(text):
+    """Detecta CSS en el texto con los patrones precompilados"""
+    text_lower = text.lower()
+    
+    # Todos los patrones necesitan al menos uno de estos caracteres
+    if ('{' in text_lower or ':' in text_lower or '@' in text_lower) and CSS_REGEX.search(text_lower):
+        return True
+    
+    return CSS_VALUES_REGEX.match(text_lower) is not None
+
+_detect_css_cached = lru_cache(maxsize=CSS_CACHE_SIZE)(_detect_css)
+
+# Configuración del scraping por lotes (se puede ajustar con variables de entorno)
+BATCH_MAX_WORKERS = int(os.environ.get('SCRAPER_BATCH_WORKERS', '16'))
+BATCH_PER_HOST_LIMIT = int(os.environ.get('SCRAPER_PER_HOST_LIMIT', '4'))
+BATCH_MAX_URLS = int(os.environ.get('SCRAPER_BATCH_MAX_URLS', '200'))
+
+# Control de admisión de las peticiones entrantes: peticiones en curso y en
+# espera, en total y por host de destino (0 desactiva el límite), espera
+# máxima en la cola antes de responder 429 y límites del Retry-After
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('SCRAPER_MAX_IN_FLIGHT', '32'))
+ADMISSION_MAX_QUEUE = int(os.environ.get('SCRAPER_MAX_QUEUE', '16'))
+ADMISSION_PER_HOST_IN_FLIGHT = int(os.environ.get('SCRAPER_PER_HOST_IN_FLIGHT', '8'))
+ADMISSION_PER_HOST_QUEUE = int(os.environ.get('SCRAPER_PER_HOST_QUEUE', '4'))
+ADMISSION_MAX_WAIT = float(os.environ.get('SCRAPER_QUEUE_WAIT', '2.0'))
+ADMISSION_RETRY_MIN = 1
+ADMISSION_RETRY_MAX = 60
+
+# Fuentes estructuradas (JSON-LD y feeds RSS/Atom) que se prueban antes que
+# la extracción heurística; por debajo de STRUCTURED_MIN_ITEMS elementos se
+# considera que describen la propia página y no un listado
+STRUCTURED_ENABLED = os.environ.get('SCRAPER_STRUCTURED', '1') != '0'
+STRUCTURED_MIN_ITEMS = int(os.environ.get('SCRAPER_STRUCTURED_MIN_ITEMS', '3'))
+FEED_HEAD_BYTES = 64 * 1024  # Los <link rel="alternate"> van en el <head>
+FEED_TYPES = (b'application/rss+xml', b'application/atom+xml')
+FEED_DOCUMENT_REGEX = re.compile(rb'\s*(?:<\?xml[^>]*>\s*)?(?:<!--.*?-->\s*)*<(?:rss|feed|rdf:RDF)\b', re.S)
+JSONLD_REGEX = re.compile(rb'<script\b[^>]*application/ld\+json[^>]*>(.*?)</script\s*>', re.I | re.S)
+LINK_TAG_REGEX = re.compile(rb'<link\b[^>]*>', re.I)
+TAG_ATTR_REGEX = re.compile(rb'([\w-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+JSONLD_ARTICLE_TYPES = frozenset([
+    'Article', 'NewsArticle', 'BlogPosting', 'ReportageNewsArticle', 'AnalysisNewsArticle',
+    'OpinionNewsArticle', 'Report', 'TechArticle', 'LiveBlogPosting',
+])
+
+# Configuración del modo rastreo (/crawl)
+CRAWL_MAX_PAGES = int(os.environ.get('SCRAPER_CRAWL_MAX_PAGES', '100'))
+CRAWL_MAX_DEPTH = int(os.environ.get('SCRAPER_CRAWL_MAX_DEPTH', '3'))
+CRAWL_DEFAULT_DELAY = float(os.environ.get('SCRAPER_CRAWL_DELAY', '1.0'))
+CRAWL_DEADLINE = float(os.environ.get('SCRAPER_CRAWL_DEADLINE', '120'))
+CRAWL_MAX_LINKS = 500  # Enlaces por página que pueden entrar en la frontera
+CRAWL_SCOPES = ('host', 'domain', 'any')
+
+# Monitorización periódica de URLs (/monitor): intervalo inicial y límites
+# del intervalo adaptativo en segundos, número de URLs y de hilos, y fichero
+# opcional donde persistir las URLs registradas
+MONITOR_INTERVAL = float(os.environ.get('SCRAPER_MONITOR_INTERVAL', '300'))
+MONITOR_MIN_INTERVAL = float(os.environ.get('SCRAPER_MONITOR_MIN_INTERVAL', '30'))
+MONITOR_MAX_INTERVAL = float(os.environ.get('SCRAPER_MONITOR_MAX_INTERVAL', '3600'))
+MONITOR_MAX_URLS = int(os.environ.get('SCRAPER_MONITOR_MAX_URLS', '1000'))
+MONITOR_WORKERS = int(os.environ.get('SCRAPER_MONITOR_WORKERS', '4'))
+MONITOR_PATH = os.environ.get('SCRAPER_MONITOR_PATH')
+MONITOR_SPEEDUP = 0.5        # Factor del intervalo cuando aparecen elementos nuevos
+MONITOR_SLOWDOWN = 1.5       # Factor cuando la página no trae nada nuevo
+MONITOR_ERROR_BACKOFF = 2.0  # Factor tras un error
+MONITOR_JITTER = 0.1         # ±10 % para que las URLs no se sincronicen
+
+# Caché de robots.txt por origen
+ROBOTS_CACHE_TTL = float(os.environ.get('SCRAPER_ROBOTS_TTL', '3600'))
+ROBOTS_ERROR_TTL = 300  # Un robots.txt inaccesible se vuelve a pedir antes
+ROBOTS_MAX_BYTES = 512 * 1024
+ROBOTS_CACHE_MAX_HOSTS = 10000
+
+# Compresión de las respuestas JSON según Accept-Encoding, a partir de
+# COMPRESS_MIN_BYTES; la calidad 11 por defecto de brotli es demasiado lenta
+# para respuestas que se generan en cada petición
+COMPRESS_MIN_BYTES = int(os.environ.get('SCRAPER_COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 5
+COMPRESS_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Formatos de salida en streaming y su tipo MIME
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+# Parsers de HTML soportados, del más rápido al más lento; lxml y html5lib
+# solo se usan si están instalados y en otro caso se recurre a html.parser
+PARSER_BACKENDS = ('lxml', 'html5lib', 'html.parser')
+AVAILABLE_PARSERS = tuple(
+    name for name in PARSER_BACKENDS
+    if name == 'html.parser' or importlib.util.find_spec(name) is not None
+)
+DEFAULT_PARSER = os.environ.get('SCRAPER_PARSER', 'html.parser')
+
+def resolve_parser(name):
+    """Devuelve el parser a usar para `name`, o html.parser si no está disponible"""
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Parser desconocido: {name}. Opciones: {', '.join(PARSER_BACKENDS)}")
+    return name if name in AVAILABLE_PARSERS else 'html.parser'
+
+# Límites de la descarga: tamaño máximo del cuerpo y tiempo total por petición
+FETCH_MAX_BYTES = int(os.environ.get('SCRAPER_MAX_BYTES', str(5 * 1024 * 1024)))
+FETCH_DEADLINE = float(os.environ.get('SCRAPER_FETCH_DEADLINE', '30'))
+FETCH_CHUNK_SIZE = 64 * 1024
+
+# Reintentos automáticos ante errores de conexión y estos códigos de estado
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 1
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# Decodificación rápida: BOM, charset de Content-Type y <meta charset> (o la
+# declaración XML) en los primeros bytes; la detección completa solo se usa
+# si nada declara la codificación, y su resultado se recuerda por host
+ENCODING_SNIFF_BYTES = 4096
+ENCODING_CACHE_MAX_HOSTS = 10000
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),  # Antes que UTF-16: empieza con los mismos bytes
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+CHARSET_HEADER_REGEX = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_CHARSET_REGEX = re.compile(rb'<meta\b[^>]*?charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+XML_ENCODING_REGEX = re.compile(rb'\s*<\?xml\b[^>]*?encoding\s*=\s*["\']([\w.:-]+)')
+
+def lookup_encoding(name):
+    """Nombre canónico de una codificación, o None si Python no la conoce"""
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+def sniff_encoding(content, content_type=None):
+    """Codificación declarada de un documento y de dónde sale, sin analizarlo entero
+    
+    Como en los navegadores, un BOM manda sobre la cabecera Content-Type, y
+    esta sobre el <meta charset> o la declaración XML de los primeros
+    ENCODING_SNIFF_BYTES bytes. Devuelve (codificación, 'bom' | 'header' |
+    'meta') o (None, None) si nada la declara.
+    """
+    for bom, encoding in BOM_ENCODINGS:
+        if content.startswith(bom):
+            return encoding, 'bom'
+    
+    if content_type:
+        match = CHARSET_HEADER_REGEX.search(content_type)
+        encoding = lookup_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding, 'header'
+    
+    head = content[:ENCODING_SNIFF_BYTES]
+    match = XML_ENCODING_REGEX.match(head) or META_CHARSET_REGEX.search(head)
+    encoding = lookup_encoding(match.group(1).decode('ascii')) if match else None
+    if encoding:
+        # Si la declaración se ha podido leer como ASCII, el documento no es UTF-16/32
+        if encoding.startswith(('utf-16', 'utf-32')):
+            encoding = 'utf-8'
+        return encoding, 'meta'
+    
+    return None, None
+
+def trim_partial_utf8(body):
+    """Quita una secuencia UTF-8 incompleta al final de un cuerpo truncado"""
+    # Retroceder sobre los bytes de continuación (10xxxxxx) hasta el byte inicial
+    index = len(body) - 1
+    while index >= 0 and len(body) - index <= 4 and body[index] & 0xC0 == 0x80:
+        index -= 1
+    if index < 0 or body[index] < 0xC0:
+        return body
+    
+    # Longitud que anuncia el byte inicial de la secuencia
+    lead = body[index]
+    expected = 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+    return body[:index] if len(body) - index < expected else body
+
+# Configuración de la caché de resultados
+CACHE_TTL = float(os.environ.get('SCRAPER_CACHE_TTL', '300'))
+CACHE_MAX_BYTES = int(os.environ.get('SCRAPER_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Historial de elementos devueltos por URL (modo solo-nuevos)
+HISTORY_MAX_URLS = int(os.environ.get('SCRAPER_HISTORY_MAX_URLS', '10000'))
+HISTORY_MAX_ITEMS = int(os.environ.get('SCRAPER_HISTORY_MAX_ITEMS', '500'))
+
+def normalize_url(url):
+    """Normaliza una URL para usarla como clave (esquema y host en minúsculas, sin puerto por defecto ni ancla)"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+class CacheEntry:
+    """Resultado cacheado de una URL junto con sus validadores HTTP"""
+    
+    __slots__ = ('items', 'links', 'source', 'content_hash', 'etag', 'last_modified', 'stored_at', 'size')
+    
+    def __init__(self, items, etag=None, last_modified=None, links=None, source=None, content_hash=None):
+        # Se guardan como tuplas para que nadie pueda modificar la caché
+        self.items = tuple((item['title'], item['link']) for item in items)
+        # Enlaces de la página, solo si se recogieron (modo rastreo)
+        self.links = tuple(links) if links is not None else None
+        self.source = source
+        # Resumen del cuerpo del que salieron los elementos
+        self.content_hash = content_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.monotonic()
+        self.size = 200 + sum(len(title) + len(link) + 100 for title, link in self.items)
+        self.size += sum(len(link) + 50 for link in self.links or ())
+    
+    def is_fresh(self, ttl):
+        return time.monotonic() - self.stored_at < ttl
+    
+    def get_items(self):
+        return [{"title": title, "link": link} for title, link in self.items]
+    
+    def get_links(self):
+        return list(self.links) if self.links is not None else None
+    
+    def conditional_headers(self):
+        """Cabeceras para revalidar la entrada con el servidor de origen"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """Caché LRU en memoria de resultados de scraping, con TTL y límite de tamaño"""
+    
+    def __init__(self, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Devuelve la entrada de una URL (aunque esté caducada) o None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def store(self, key, items, headers, links=None, source=None, content_hash=None):
+        """Guarda el resultado de una URL, expulsando las entradas menos usadas"""
+        if 'no-store' in headers.get('Cache-Control', '').lower():
+            return
         
-        # Configurar reintentos automáticos
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        entry = CacheEntry(items, headers.get('ETag'), headers.get('Last-Modified'), links, source, content_hash)
+        if entry.size > self.max_bytes:
+            return
         
-        # Headers más realistas
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self._entries[key] = entry
+            self.size += entry.size
+            
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
     
-    def clean_soup(self, soup):
-        """Limpia el HTML de elementos innecesarios de forma más agresiva"""
+    def refresh(self, key, headers):
+        """Renueva una entrada tras un 304 o un cuerpo idéntico al guardado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.stored_at = time.monotonic()
+            entry.etag = headers.get('ETag', entry.etag)
+            entry.last_modified = headers.get('Last-Modified', entry.last_modified)
+    
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes, "ttl": self.ttl}
+
+def item_fingerprint(item):
+    """Huella compacta (8 bytes) de un elemento, con la misma clave que dedupe_items"""
+    key = f"{item['title'].lower().strip()}\x00{item['link']}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
+
+class ItemHistory:
+    """Huellas de los elementos ya vistos en cada URL, para devolver solo los nuevos
+    
+    Cada URL tiene una generación que avanza cada vez que un scraping trae
+    elementos que no se habían visto, y cada huella recuerda la generación
+    en la que apareció. El cursor que recibe el cliente es
+    "<instancia>.<generación>"; un cursor de otra instancia (otro proceso o
+    un reinicio) no se puede interpretar y se trata como si no hubiera.
+    """
+    
+    def __init__(self, max_urls=HISTORY_MAX_URLS, max_items=HISTORY_MAX_ITEMS):
+        self.max_urls = max_urls
+        self.max_items = max_items
+        self.instance = os.urandom(4).hex()
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def observe(self, url, items):
+        """Registra los elementos devueltos para una URL
         
-        # Elementos a eliminar completamente
-        unwanted_tags = [
-            'style', 'script', 'noscript', 'iframe', 'embed', 'object',
-            'svg', 'canvas', 'audio', 'video', 'source', 'track',
-            'meta', 'link', 'base', 'head', 'title', 'form', 'input',
-            'button', 'textarea', 'select', 'option', 'label', 'fieldset',
-            'legend', 'nav', 'aside', 'footer', 'header'
-        ]
+        Devuelve la generación en que apareció cada elemento, la generación
+        anterior a esta llamada y la actual.
+        """
+        fingerprints = [item_fingerprint(item) for item in items]
+        key = normalize_url(url)
         
-        for tag_name in unwanted_tags:
-            for tag in soup.find_all(tag_name):
-                tag.decompose()
+        with self._lock:
+            history = self._urls.get(key)
+            if history is None:
+                history = self._urls[key] = [0, OrderedDict()]
+                while len(self._urls) > self.max_urls:
+                    self._urls.popitem(last=False)
+            self._urls.move_to_end(key)
+            
+            previous, seen = history
+            if any(fingerprint not in seen for fingerprint in fingerprints):
+                history[0] += 1
+            
+            # Los elementos que siguen en la página se mantienen como recientes
+            generations = []
+            for fingerprint in fingerprints:
+                generations.append(seen.setdefault(fingerprint, history[0]))
+                seen.move_to_end(fingerprint)
+            while len(seen) > self.max_items:
+                seen.popitem(last=False)
+            
+            return generations, previous, history[0]
+    
+    def cursor(self, generation):
+        return f"{self.instance}.{generation}"
+    
+    def parse_cursor(self, cursor):
+        """Generación de un cursor de esta instancia, o None si no es válido"""
+        instance, _, generation = str(cursor).partition('.')
+        if instance != self.instance or not generation.isdigit():
+            return None
+        return int(generation)
+    
+    def __len__(self):
+        return len(self._urls)
+
+# Límites de los buckets de los histogramas de duración, en segundos
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRICS_HELP = {
+    'scraper_stage_duration_seconds': ('histogram', 'Duración de cada etapa del scraping'),
+    'scraper_scrape_duration_seconds': ('histogram', 'Duración total de scrape_website'),
+    'scraper_cache_results_total': ('counter', 'Resultados de la caché por tipo'),
+    'scraper_upstream_responses_total': ('counter', 'Respuestas del origen por código de estado'),
+    'scraper_downloaded_bytes_total': ('counter', 'Bytes descargados de los orígenes'),
+    'scraper_errors_total': ('counter', 'Errores de scraping por tipo'),
+    'scraper_truncated_total': ('counter', 'Descargas truncadas por motivo'),
+    'scraper_profile_results_total': ('counter', 'Uso de los perfiles de extracción aprendidos por dominio'),
+    'scraper_coalesced_total': ('counter', 'Peticiones resueltas con el scraping en curso de otra petición'),
+    'scraper_monitor_checks_total': ('counter', 'Comprobaciones de URLs monitorizadas por resultado'),
+    'scraper_admission_rejected_total': ('counter', 'Peticiones rechazadas con 429 por límite alcanzado'),
+    'scraper_admission_wait_seconds': ('histogram', 'Tiempo en la cola de admisión de las peticiones admitidas'),
+    'scraper_charset_total': ('counter', 'Páginas decodificadas según de dónde salió la codificación'),
+    'scraper_parse_limited_total': ('counter', 'Páginas cuyo árbol se recortó por superar un límite de tamaño'),
+    'scraper_not_modified_total': ('counter', 'Respuestas de /scrape resueltas con 304 por If-None-Match'),
+    'scraper_response_bytes_total': ('counter', 'Bytes de respuestas JSON enviados por codificación'),
+}
+
+class Metrics:
+    """Registro mínimo de contadores e histogramas en formato Prometheus"""
+    
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+    
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Contadores por bucket, suma y número de observaciones
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+    
+    def render(self):
+        """Devuelve todas las métricas en el formato de texto de Prometheus"""
+        def format_labels(labels):
+            if not labels:
+                return ''
+            return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
         
-        # Eliminar comentarios HTML
-        for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
+        def format_value(value):
+            # Exacto: con :g los contadores de bytes pasarían a notación
+            # científica de 6 cifras y rate() los vería estancados
+            if float(value).is_integer():
+                return str(int(value))
+            return repr(float(value))
         
-        # Eliminar todos los atributos CSS y JavaScript
-        for tag in soup.find_all():
-            # Solo mantener href para enlaces
-            if tag.name == 'a' and tag.get('href'):
-                tag.attrs = {'href': tag['href']}
-            else:
-                tag.attrs = {}
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(buckets), total, count))
+                                for key, (buckets, total, count) in self._histograms.items())
         
-        # Eliminar elementos que típicamente contienen CSS/JS inline
-        for tag in soup.find_all():
-            # Si el elemento contiene solo espacios en blanco o CSS, eliminarlo
-            text_content = tag.get_text(strip=True)
-            if not text_content or self.contains_css_like_content(text_content):
-                tag.decompose()
+        lines = []
+        described = set()
         
-        return soup
+        def describe(name):
+            if name not in described and name in METRICS_HELP:
+                kind, help_text = METRICS_HELP[name]
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                described.add(name)
+        
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        
+        for (name, labels), (buckets, total, count) in histograms:
+            describe(name)
+            for bound, bucket_count in zip(self.buckets, buckets):
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", f"{bound:g}"),))} {bucket_count}')
+            lines.append(f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{format_labels(labels)} {total:.6f}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+        
+        return '\n'.join(lines) + '\n'
+
+class StageTimer:
+    """Cronómetro por etapas: cada lap() asigna el tiempo transcurrido a una etapa
     
-    def contains_css_like_content(self, text):
-        """Detecta si el texto contiene CSS o contenido no deseado"""
-        css_patterns = [
-            r'{\s*[^}]*:\s*[^}]*}',  # CSS rules
-            r'@media\s+',            # Media queries
-            r'\.[\w-]+\s*{',         # CSS classes
-            r'#[\w-]+\s*{',          # CSS IDs
-            r':\s*\d+px',            # CSS pixels
-            r'color\s*:\s*#?[a-fA-F0-9]+',  # Colors
-            r'font-size\s*:',        # Font properties
-            r'margin\s*:',           # Margin
-            r'padding\s*:',          # Padding
-            r'display\s*:',          # Display
-            r'position\s*:',         # Position
-            r'background\s*:',       # Background
-            r'border\s*:',           # Border
-            r'width\s*:\s*\d+',      # Width
-            r'height\s*:\s*\d+',     # Height
-        ]
+    Si se pasa el diccionario `memory` y tracemalloc está activo, se anota
+    además en él el pico de memoria asignada (en bytes) durante cada etapa
+    y, en 'total', el pico desde que se creó el cronómetro.
+    """
+    
+    def __init__(self, timings=None, memory=None):
+        self.timings = timings if timings is not None else {}
+        self.memory = memory if memory is not None and tracemalloc.is_tracing() else None
+        if self.memory is not None:
+            tracemalloc.reset_peak()
+            self._start_memory = self._last_memory = tracemalloc.get_traced_memory()[0]
+        self._last = time.perf_counter()
+    
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+        if self.memory is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            self.memory[stage] = max(self.memory.get(stage, 0), peak - self._last_memory)
+            self.memory['total'] = max(self.memory.get('total', 0), peak - self._start_memory)
+            self._last_memory = current
+            tracemalloc.reset_peak()
+        self._last = time.perf_counter()
+
+# Límites del árbol al parsear una página: pasadas PARSE_MAX_NODES etiquetas
+# se descarta el resto del documento, y las etiquetas anidadas a más de
+# PARSE_MAX_DEPTH niveles no se crean
+PARSE_MAX_NODES = int(os.environ.get('SCRAPER_PARSE_MAX_NODES', '100000'))
+PARSE_MAX_DEPTH = int(os.environ.get('SCRAPER_PARSE_MAX_DEPTH', '256'))
+
+class LimitedSoup(BeautifulSoup):
+    """BeautifulSoup que deja de crear nodos al superar los límites de tamaño del árbol
+    
+    Una etiqueta más profunda que `max_depth` no se crea (su texto queda en
+    el ancestro más profundo permitido) y, al llegar a `max_nodes`
+    etiquetas, se ignora el resto del documento. El árbol resultante es un
+    prefijo válido de la página; `limited` indica el motivo ('depth' o
+    'nodes') o es None. Con html5lib, que construye el árbol por su cuenta,
+    los límites no se aplican.
+    """
+    
+    def __init__(self, markup, features, max_nodes=PARSE_MAX_NODES, max_depth=PARSE_MAX_DEPTH):
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        super().__init__(markup, features)
+    
+    def reset(self):
+        super().reset()
+        self.limited = None
+        self._nodes = 0
+        # Etiquetas no creadas por profundidad cuyo cierre hay que ignorar
+        self._skipped = defaultdict(int)
+    
+    def handle_starttag(self, name, namespace, nsprefix, attrs, *args, **kwargs):
+        if self.limited == 'nodes':
+            return None
+        if self._nodes >= self.max_nodes:
+            self.limited = 'nodes'
+            return None
+        if len(self.tagStack) > self.max_depth:
+            self.limited = self.limited or 'depth'
+            # Las etiquetas vacías (br, img...) no tienen cierre que ignorar
+            if not self.builder.can_be_empty_element(name):
+                self._skipped[name] += 1
+            return None
+        self._nodes += 1
+        return super().handle_starttag(name, namespace, nsprefix, attrs, *args, **kwargs)
+    
+    def handle_endtag(self, name, nsprefix=None):
+        if self.limited == 'nodes':
+            return
+        if self._skipped.get(name):
+            self._skipped[name] -= 1
+            return
+        super().handle_endtag(name, nsprefix)
+    
+    def handle_data(self, data):
+        if self.limited != 'nodes':
+            super().handle_data(data)
+
+# Perfilado opcional de memoria con tracemalloc: pico por etapa y por dominio
+MEMORY_PROFILE = os.environ.get('SCRAPER_MEMORY_PROFILE', '0') == '1'
+MEMORY_PROFILE_MAX_DOMAINS = 1000
+
+class MemoryProfile:
+    """Picos de memoria de la extracción por etapa y por dominio
+    
+    Solo se activa con SCRAPER_MEMORY_PROFILE=1, porque tracemalloc hace más
+    lenta cada asignación. tracemalloc mide todo el proceso, así que con
+    varias extracciones simultáneas en hilos las cifras se mezclan: son
+    exactas con el pool de procesos (cada proceso tiene su tracemalloc) o
+    con un solo hilo de extracción.
+    """
+    
+    def __init__(self, enabled=MEMORY_PROFILE, max_domains=MEMORY_PROFILE_MAX_DOMAINS):
+        self.enabled = enabled
+        self.max_domains = max_domains
+        self._stages = {}
+        self._domains = OrderedDict()
+        self._lock = threading.Lock()
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    def record(self, domain, url, memory):
+        """Registra los picos por etapa (en bytes) de la extracción de una página"""
+        stages = {stage: size for stage, size in memory.items() if stage != 'total'}
+        peak = memory.get('total', 0)
+        with self._lock:
+            for stage, size in stages.items():
+                samples = self._stages.setdefault(stage, [0, 0, 0])
+                samples[0] += 1
+                samples[1] += size
+                samples[2] = max(samples[2], size)
+            
+            entry = self._domains.get(domain)
+            if entry is None:
+                entry = self._domains[domain] = {"pages": 0, "peak_bytes": 0, "peak_stage": None, "peak_url": None}
+                while len(self._domains) > self.max_domains:
+                    self._domains.popitem(last=False)
+            self._domains.move_to_end(domain)
+            entry["pages"] += 1
+            if peak >= entry["peak_bytes"]:
+                entry["peak_bytes"] = peak
+                entry["peak_stage"] = max(stages, key=stages.get, default=None)
+                entry["peak_url"] = url
+    
+    def stats(self, top=20):
+        """Resumen por etapa y los `top` dominios con mayor pico"""
+        with self._lock:
+            stages = {
+                stage: {"pages": pages, "avg_bytes": round(total / pages), "max_bytes": peak}
+                for stage, (pages, total, peak) in self._stages.items()
+            }
+            domains = sorted(self._domains.items(), key=lambda item: item[1]["peak_bytes"], reverse=True)[:top]
+        return {
+            "enabled": self.enabled,
+            "traced_bytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+            "stages": stages,
+            "domains": [{"domain": domain, **entry} for domain, entry in domains],
+        }
+
+# Número de procesos para parsear y extraer (0 = en el hilo de la petición).
+# forkserver evita hacer fork de un proceso con hilos en marcha
+EXTRACT_PROCESSES = int(os.environ.get('SCRAPER_EXTRACT_PROCESSES', '0'))
+EXTRACT_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Perfiles de extracción por dominio: número máximo de dominios recordados,
+# fichero donde persistirlos (opcional) y cada cuántos cambios se guardan
+PROFILE_MAX_DOMAINS = int(os.environ.get('SCRAPER_PROFILE_MAX_DOMAINS', '5000'))
+PROFILES_PATH = os.environ.get('SCRAPER_PROFILES_PATH')
+PROFILE_SAVE_EVERY = 25
+
+class DomainProfiles:
+    """Selectores de entradas que funcionaron para cada dominio
+    
+    Es un LRU acotado en memoria que, si se indica `path`, se carga con
+    start() y desde entonces se guarda en disco en JSON cada `save_every`
+    cambios y al terminar si hay cambios. Solo el proceso que sirve la API
+    llama a start(): los procesos de extracción o de replay que importan
+    este módulo no deben pisar el fichero con su copia.
+    """
+    
+    def __init__(self, max_domains=PROFILE_MAX_DOMAINS, path=PROFILES_PATH, save_every=PROFILE_SAVE_EVERY):
+        self.max_domains = max_domains
+        self.path = path
+        self.save_every = save_every
+        self._profiles = OrderedDict()
+        self._changes = 0
+        self._lock = threading.Lock()
+        self._started = False
+    
+    def start(self):
+        """Carga los perfiles guardados y activa su guardado en disco (una sola vez)"""
+        if self._started or not self.path:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        if os.path.exists(self.path):
+            self.load(self.path)
+        atexit.register(self.save_if_changed)
+    
+    def get(self, domain):
+        """Devuelve una copia del perfil del dominio o None"""
+        with self._lock:
+            profile = self._profiles.get(domain)
+            if profile is None:
+                return None
+            self._profiles.move_to_end(domain)
+            return dict(profile)
+    
+    def record(self, domain, learned):
+        """Registra el perfil que produjo resultados para el dominio"""
+        with self._lock:
+            profile = self._profiles.get(domain)
+            if profile is not None and profile['selectors'] == learned['selectors']:
+                profile['uses'] += 1
+                self._profiles.move_to_end(domain)
+                return
+            
+            self._profiles[domain] = {
+                "selectors": list(learned['selectors']),
+                "uses": 1,
+            }
+            self._profiles.move_to_end(domain)
+            while len(self._profiles) > self.max_domains:
+                self._profiles.popitem(last=False)
+            
+            self._changes += 1
+            should_save = self._started and self._changes >= self.save_every
+        
+        if should_save:
+            self.save()
+    
+    def save(self, path=None):
+        """Guarda los perfiles en disco de forma atómica"""
+        path = path or self.path
+        if not path:
+            return
         
-        text_lower = text.lower()
-        for pattern in css_patterns:
-            if re.search(pattern, text_lower):
-                return True
+        with self._lock:
+            data = json.dumps(self._profiles, ensure_ascii=False)
+            self._changes = 0
         
-        # Si es solo números, guiones, puntos y espacios (típico de CSS)
-        if re.match(r'^[\d\s\-\.;:,px%emremvh]+
+        # Los perfiles son una optimización: un fallo al guardar no debe
+        # afectar al scraping. Fichero temporal propio de cada proceso e hilo
+        # para que dos escrituras simultáneas no se pisen
+        try:
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
     
-    def extract_text_content(self, element):
-        """Extrae texto limpio de un elemento"""
-        if not element:
-            return ""
+    def save_if_changed(self):
+        """Guarda los perfiles si cambiaron desde el último guardado (al terminar)"""
+        if self._changes:
+            self.save()
+    
+    def load(self, path):
+        """Carga los perfiles guardados previamente en disco"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
         
-        # Obtener solo el texto visible, sin HTML
-        text = element.get_text(separator=' ', strip=True)
+        with self._lock:
+            for domain, profile in data.items():
+                if isinstance(profile, dict) and isinstance(profile.get('selectors'), list):
+                    self._profiles[domain] = profile
+            while len(self._profiles) > self.max_domains:
+                self._profiles.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._profiles)
+
+# Almacén opcional en disco de las páginas descargadas, para replay
+STORE_PATH = os.environ.get('SCRAPER_STORE_PATH')
+STORE_MAX_BYTES = int(os.environ.get('SCRAPER_STORE_MAX_BYTES', str(1024 * 1024 * 1024)))
+STORE_COMPRESS_LEVEL = 6
+# Escrituras pendientes como máximo; con la cola llena las descargas no se guardan
+STORE_MAX_PENDING = int(os.environ.get('SCRAPER_STORE_MAX_PENDING', '64'))
+
+class PageStore:
+    """Almacén en disco de los cuerpos descargados, comprimidos y direccionados por contenido
+    
+    Cada cuerpo se guarda una sola vez con gzip en objects/<sha256[:2]>/<sha256>.gz
+    y un índice SQLite registra cada descarga (URL, fecha, estado, cabeceras
+    y resumen del cuerpo). Al pasar de `max_bytes` comprimidos (None = sin
+    límite) se borran las descargas más antiguas y los cuerpos que ya nadie
+    referencia. Las escrituras se hacen en un hilo propio para no retrasar
+    las respuestas; sus errores se registran en el log y se cuentan en
+    stats() sin afectar al scraping. Como cada escritura pendiente retiene
+    el cuerpo en memoria, con `max_pending` escrituras en cola las nuevas
+    descargas se descartan (y se cuentan) en lugar de esperar.
+    """
+    
+    def __init__(self, path=STORE_PATH, max_bytes=STORE_MAX_BYTES, max_pending=STORE_MAX_PENDING):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        os.makedirs(os.path.join(path, 'objects'), exist_ok=True)
         
-        # Filtrar si contiene CSS
-        if self.contains_css_like_content(text):
-            return ""
+        self._db = sqlite3.connect(os.path.join(path, 'index.sqlite'), timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY, size INTEGER NOT NULL, stored_size INTEGER NOT NULL)""")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS fetches (
+                id INTEGER PRIMARY KEY, url TEXT NOT NULL, fetched_at REAL NOT NULL, status INTEGER,
+                headers TEXT, digest TEXT NOT NULL, truncated TEXT)""")
+            self._db.execute('CREATE INDEX IF NOT EXISTS fetches_url ON fetches (url, fetched_at)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS fetches_time ON fetches (fetched_at)')
         
-        # Limpiar espacios múltiples y caracteres especiales
-        text = re.sub(r'\s+', ' ', text)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='page-store')
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.write_errors = 0
+        self.dropped = 0
+    
+    def object_path(self, digest):
+        return os.path.join(self.path, 'objects', digest[:2], digest + '.gz')
+    
+    def put(self, url, status, headers, body, truncated=False):
+        """Encola el guardado de una descarga y vuelve sin esperar (None si la cola está llena)"""
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return None
+            self._pending += 1
+        future = self._writer.submit(self._write, url, time.time(), status, dict(headers), body, truncated)
+        future.add_done_callback(lambda future: self._write_done(future, url))
+        return future
+    
+    def _write_done(self, future, url):
+        """Libera el hueco en la cola y registra los errores (disco lleno, base de datos bloqueada...)"""
+        with self._pending_lock:
+            self._pending -= 1
+        error = future.exception()
+        if error is not None:
+            self.write_errors += 1
+            app.logger.error("No se pudo guardar la descarga de %s en %s: %r", url, self.path, error)
+    
+    def _write(self, url, fetched_at, status, headers, body, truncated):
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self.object_path(digest)
         
-        # Mantener solo caracteres alfanuméricos, espacios y puntuación básica
-        text = re.sub(r'[^\w\s\-.,;:!?¿¡áéíóúüñÁÉÍÓÚÜÑ()"\']', ' ', text)
-        text = re.sub(r'\s+', ' ', text)  # Limpiar espacios múltiples otra vez
+        # El mismo cuerpo descargado varias veces se guarda una sola vez
+        stored_size = None
+        if not os.path.exists(object_path):
+            data = gzip.compress(body, compresslevel=STORE_COMPRESS_LEVEL, mtime=0)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, object_path)
+            stored_size = len(data)
         
-        return text.strip()
+        with self._lock, self._db:
+            if stored_size is not None:
+                self._db.execute('INSERT OR IGNORE INTO blobs VALUES (?, ?, ?)', (digest, len(body), stored_size))
+            self._db.execute(
+                'INSERT INTO fetches (url, fetched_at, status, headers, digest, truncated) VALUES (?, ?, ?, ?, ?, ?)',
+                (url, fetched_at, status, json.dumps(headers), digest, truncated or None))
+            self._evict()
     
-    def is_valid_url(self, url):
-        """Valida si una URL es válida"""
+    def _evict(self):
+        """Borra las descargas más antiguas hasta volver por debajo del límite"""
+        if self.max_bytes is None:
+            return
+        total = self._db.execute('SELECT COALESCE(SUM(stored_size), 0) FROM blobs').fetchone()[0]
+        while total > self.max_bytes:
+            oldest = self._db.execute('SELECT id, digest FROM fetches ORDER BY fetched_at LIMIT 100').fetchall()
+            if not oldest:
+                break
+            for fetch_id, digest in oldest:
+                self._db.execute('DELETE FROM fetches WHERE id = ?', (fetch_id,))
+                if self._db.execute('SELECT 1 FROM fetches WHERE digest = ? LIMIT 1', (digest,)).fetchone():
+                    continue
+                row = self._db.execute('SELECT stored_size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+                self._db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+                try:
+                    os.remove(self.object_path(digest))
+                except OSError:
+                    pass
+                total -= row[0] if row else 0
+                if total <= self.max_bytes:
+                    break
+    
+    def get(self, digest):
+        """Cuerpo original (descomprimido) de un resumen, o None si ya no está"""
         try:
-            result = urlparse(url)
-            return all([result.scheme, result.netloc])
-        except:
-            return False
+            with open(self.object_path(digest), 'rb') as f:
+                return gzip.decompress(f.read())
+        except OSError:
+            return None
     
-    def is_meaningful_title(self, title):
-        """Verifica si el título tiene contenido significativo"""
-        if not title or len(title.strip()) < 3:
-            return False
-        
-        # Filtrar títulos que son solo espacios, números o caracteres especiales
-        if re.match(r'^[\s\d\W]*$', title):
-            return False
+    def fetches(self, url=None, url_prefix=None, since=None, until=None, latest=False):
+        """Descargas guardadas, por fecha, filtradas por URL o prefijo e intervalo de tiempo
         
-        # Filtrar títulos demasiado genéricos
-        generic_titles = [
-            'leer más', 'ver más', 'continuar', 'siguiente', 'anterior',
-            'inicio', 'home', 'menú', 'menu', 'buscar', 'search'
-        ]
+        Con `latest` solo se devuelve la más reciente de cada URL.
+        """
+        conditions, params = [], []
+        if url is not None:
+            conditions.append('url = ?')
+            params.append(url)
+        if url_prefix is not None:
+            conditions.append('substr(url, 1, ?) = ?')
+            params.extend((len(url_prefix), url_prefix))
+        if since is not None:
+            conditions.append('fetched_at >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('fetched_at <= ?')
+            params.append(until)
+        if latest:
+            conditions.append('fetched_at = (SELECT MAX(f.fetched_at) FROM fetches f WHERE f.url = fetches.url)')
         
-        if title.lower().strip() in generic_titles:
-            return False
+        query = 'SELECT url, fetched_at, status, headers, digest, truncated FROM fetches'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY fetched_at'
         
-        return True
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [
+            {"url": url, "fetched_at": fetched_at, "status": status, "headers": json.loads(headers or '{}'),
+             "digest": digest, "truncated": truncated or False}
+            for url, fetched_at, status, headers, digest, truncated in rows
+        ]
     
-    def get_best_title(self, entry):
-        """Obtiene el mejor título de un elemento"""
-        title_candidates = []
+    def flush(self):
+        """Espera a que terminen las escrituras pendientes"""
+        self._writer.submit(lambda: None).result()
+    
+    def stats(self):
+        with self._lock:
+            pages = self._db.execute('SELECT COUNT(*) FROM fetches').fetchone()[0]
+            bodies, size, stored_size = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs').fetchone()
+        return {"pages": pages, "bodies": bodies, "bytes": size, "stored_bytes": stored_size,
+                "max_bytes": self.max_bytes, "write_errors": self.write_errors, "pending": self._pending,
+                "dropped": self.dropped}
+
+class Overloaded(Exception):
+    """El servicio está saturado: la petición se rechaza con 429"""
+    
+    def __init__(self, scope, retry_after):
+        super().__init__(f"Servicio saturado ({scope}); reintentar en {retry_after} s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+class AdmissionControl:
+    """Límite de peticiones en curso, en total y por host, con una cola de espera corta
+    
+    Una petición entra si hay hueco en el límite global y en el de su host.
+    Si no, espera como mucho `max_wait` segundos en una cola acotada; con la
+    cola llena o agotada la espera se rechaza con Overloaded, que lleva el
+    Retry-After estimado a partir de la duración media de las peticiones.
+    """
+    
+    def __init__(self, max_in_flight=ADMISSION_MAX_IN_FLIGHT, max_queue=ADMISSION_MAX_QUEUE,
+                 per_host_in_flight=ADMISSION_PER_HOST_IN_FLIGHT, per_host_queue=ADMISSION_PER_HOST_QUEUE,
+                 max_wait=ADMISSION_MAX_WAIT, metrics=None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.per_host_in_flight = per_host_in_flight
+        self.per_host_queue = per_host_queue
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._host_in_flight = defaultdict(int)
+        self._host_waiting = defaultdict(int)
+        # Media móvil de la duración de las peticiones, para el Retry-After
+        self._avg_duration = 1.0
+        self._cond = threading.Condition()
+    
+    def _has_room(self, host):
+        return ((self.max_in_flight <= 0 or self.in_flight < self.max_in_flight)
+                and (host is None or self.per_host_in_flight <= 0
+                     or self._host_in_flight.get(host, 0) < self.per_host_in_flight))
+    
+    def _check_queue(self, host):
+        """Rechaza la petición si no cabe en la cola (con el cerrojo tomado)"""
+        if self.waiting >= self.max_queue:
+            raise self._reject('global')
+        if host is not None and self._host_waiting.get(host, 0) >= self.per_host_queue:
+            raise self._reject('host')
+    
+    def _reject(self, scope):
+        """Rechaza una petición (con el cerrojo tomado)"""
+        if scope == 'host':
+            limit, load = self.per_host_in_flight, self.per_host_queue + self.per_host_in_flight
+        else:
+            limit, load = self.max_in_flight, self.waiting + self.in_flight
+        retry_after = int(min(max(self._avg_duration * load / max(limit, 1), ADMISSION_RETRY_MIN),
+                              ADMISSION_RETRY_MAX) + 0.999)
+        self.rejected += 1
+        if self.metrics is not None:
+            self.metrics.inc('scraper_admission_rejected_total', scope=scope)
+        return Overloaded(scope, retry_after)
+    
+    def acquire(self, host=None, block=True):
+        """Ocupa un hueco para una petición hacia `host` (None: solo el límite global)
         
-        # Buscar en diferentes elementos por orden de prioridad
-        for selector in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            elements = entry.find_all(selector)
-            for elem in elements:
-                text = self.extract_text_content(elem)
-                if self.is_meaningful_title(text):
-                    title_candidates.append((text, len(text)))
+        Devuelve el instante de entrada, que hay que pasar a release(). Con
+        block=False devuelve None en vez de esperar si no hay hueco, para que
+        el llamante espere en otro hilo. Lanza Overloaded si se rechaza.
+        """
+        start = time.monotonic()
+        with self._cond:
+            if not self._has_room(host):
+                self._check_queue(host)
+                if not block:
+                    return None
+                self._wait(host, start)
+            
+            self.in_flight += 1
+            if host is not None:
+                self._host_in_flight[host] += 1
         
-        # Si no hay títulos en headers, buscar en enlaces
-        if not title_candidates:
-            links = entry.find_all('a', href=True)
-            for link in links:
-                text = self.extract_text_content(link)
-                if self.is_meaningful_title(text):
-                    title_candidates.append((text, len(text)))
+        if self.metrics is not None:
+            self.metrics.observe('scraper_admission_wait_seconds', time.monotonic() - start)
+        return time.monotonic()
+    
+    def _wait(self, host, start):
+        """Espera en la cola hasta que haya hueco (con el cerrojo tomado)"""
+        self.waiting += 1
+        if host is not None:
+            self._host_waiting[host] += 1
+        try:
+            deadline = start + self.max_wait
+            while not self._has_room(host):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    host_full = host is not None and (self.max_in_flight <= 0 or self.in_flight < self.max_in_flight)
+                    raise self._reject('host' if host_full else 'global')
+                self._cond.wait(remaining)
+        finally:
+            self.waiting -= 1
+            if host is not None:
+                self._host_waiting[host] -= 1
+                if not self._host_waiting[host]:
+                    del self._host_waiting[host]
+    
+    def release(self, host, started_at):
+        """Libera el hueco ocupado con acquire()"""
+        with self._cond:
+            self.in_flight -= 1
+            if host is not None:
+                self._host_in_flight[host] -= 1
+                if not self._host_in_flight[host]:
+                    del self._host_in_flight[host]
+            self._avg_duration += 0.1 * (time.monotonic() - started_at - self._avg_duration)
+            # Los que esperan pueden ser de hosts distintos: se despierta a todos
+            self._cond.notify_all()
+    
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "rejected": self.rejected,
+                "busy_hosts": len(self._host_in_flight),
+                "saturated": self.max_in_flight > 0 and self.in_flight >= self.max_in_flight,
+            }
+
+class FlightCall:
+    """Llamada en curso compartida por todas las peticiones con la misma clave"""
+    
+    __slots__ = ('done', 'result', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Agrupa las llamadas concurrentes con la misma clave en una sola ejecución"""
+    
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, func):
+        """Ejecuta func() o espera al resultado de la llamada en curso con la misma clave
         
-        # Si aún no hay títulos, buscar en elementos con texto
-        if not title_candidates:
-            for tag in ['span', 'div', 'p']:
-                elements = entry.find_all(tag)
-                for elem in elements:
-                    text = self.extract_text_content(elem)
-                    if self.is_meaningful_title(text) and len(text) < 200:
-                        title_candidates.append((text, len(text)))
+        Devuelve una tupla (resultado, compartido), donde `compartido` indica
+        si el resultado se obtuvo de la llamada de otro hilo.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = FlightCall()
+                self.executed += 1
+            else:
+                self.coalesced += 1
         
-        # Retornar el título más apropiado (ni muy corto ni muy largo)
-        if title_candidates:
-            # Ordenar por longitud y tomar uno de longitud media
-            title_candidates.sort(key=lambda x: x[1])
-            mid_index = len(title_candidates) // 2
-            return title_candidates[mid_index][0]
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise Exception(str(call.error))
+            return call.result, True
         
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self.executed, "coalesced": self.coalesced}
+
+class RobotsCache:
+    """Reglas de robots.txt por origen, con caducidad y límite de orígenes"""
+    
+    def __init__(self, ttl=ROBOTS_CACHE_TTL, max_hosts=ROBOTS_CACHE_MAX_HOSTS):
+        self.ttl = ttl
+        self.max_hosts = max_hosts
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, origin):
+        """Reglas vigentes de un origen, o None si hay que (volver a) pedirlas"""
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            self._entries.move_to_end(origin)
+            return entry[0]
+    
+    def store(self, origin, rules, ttl=None):
+        with self._lock:
+            self._entries[origin] = (rules, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(origin)
+            while len(self._entries) > self.max_hosts:
+                self._entries.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._entries)
+
+class CrawlFrontier:
+    """URLs pendientes de un rastreo, agrupadas por host
+    
+    Cada host tiene su propia cola (recorrido en anchura), como mucho una
+    petición en curso y el instante a partir del cual se le puede volver a
+    pedir una página. Mientras un host espera su crawl-delay se sirven las
+    URLs de los demás.
+    """
+    
+    def __init__(self):
+        self.seen = set()
+        self._queues = OrderedDict()
+        self._ready_at = {}
+        self._busy = set()
+    
+    def add(self, url, depth, parent=None):
+        """Añade una URL si no se ha visto antes (con la misma normalización que la caché)"""
+        key = normalize_url(url)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        host = urlsplit(key).netloc
+        self._queues.setdefault(host, deque()).append((url, depth, parent))
+        return True
+    
+    def pop(self, now):
+        """Siguiente URL de un host libre y sin espera pendiente, o None"""
+        for host, queue in self._queues.items():
+            if queue and host not in self._busy and self._ready_at.get(host, 0) <= now:
+                self._busy.add(host)
+                # El host pasa al final para repartir el turno entre todos
+                self._queues.move_to_end(host)
+                return host, queue.popleft()
         return None
     
-    def scrape_website(self, url):
-        """Método principal de scraping"""
+    def release(self, host, delay):
+        """Marca el host como libre a partir de `delay` segundos desde ahora"""
+        self._busy.discard(host)
+        self._ready_at[host] = time.monotonic() + delay
+    
+    def wait_time(self, now):
+        """Segundos hasta que algún host libre con URLs pendientes esté listo, o None"""
+        waits = [
+            self._ready_at.get(host, 0) - now
+            for host, queue in self._queues.items() if queue and host not in self._busy
+        ]
+        return max(0.0, min(waits)) if waits else None
+    
+    def __len__(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+def in_crawl_scope(url, seed, scope):
+    """Indica si una URL entra en el rastreo según la regla de dominio"""
+    if scope == 'any':
+        return True
+    host = urlsplit(normalize_url(url)).netloc
+    seed_host = urlsplit(normalize_url(seed)).netloc
+    if scope == 'host':
+        return host == seed_host
+    
+    # 'domain': el host de la semilla (sin www.) y todos sus subdominios
+    base = seed_host[4:] if seed_host.startswith('www.') else seed_host
+    return host == base or host.endswith('.' + base)
+
+class MonitoredUrl:
+    """URL monitorizada: su configuración, el intervalo actual y el último resultado"""
+    
+    __slots__ = ('url', 'parser', 'min_interval', 'max_interval', 'interval', 'next_run', 'running',
+                 'result', 'generations', 'fingerprints', 'checks', 'changes', 'errors', 'last_error',
+                 'last_checked', 'last_changed')
+    
+    def __init__(self, url, parser=None, interval=MONITOR_INTERVAL, min_interval=MONITOR_MIN_INTERVAL,
+                 max_interval=MONITOR_MAX_INTERVAL):
+        self.url = url
+        self.parser = parser
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min(max(interval, min_interval), max_interval)
+        self.next_run = 0.0
+        self.running = False
+        # Último resultado correcto, generación de cada elemento y sus huellas
+        self.result = None
+        self.generations = None
+        self.fingerprints = None
+        self.checks = self.changes = self.errors = 0
+        self.last_error = None
+        self.last_checked = None
+        self.last_changed = None
+    
+    def config(self):
+        return {"url": self.url, "parser": self.parser, "interval": self.interval,
+                "min_interval": self.min_interval, "max_interval": self.max_interval}
+    
+    def status(self):
+        return {
+            **self.config(),
+            "interval": round(self.interval, 1),
+            "next_check_in": round(max(0.0, self.next_run - time.monotonic()), 1) if not self.running else 0,
+            "checking": self.running,
+            "checks": self.checks,
+            "changes": self.changes,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_checked": self.last_checked,
+            "last_changed": self.last_changed,
+            "total_items": self.result["total_items"] if self.result else None,
+        }
+
+class Monitor:
+    """Vuelve a scrapear en segundo plano las URLs registradas con un intervalo adaptativo
+    
+    Un hilo planificador guarda en un montículo la próxima comprobación de
+    cada URL y la lanza en un pool propio de `workers` hilos, con como mucho
+    una comprobación en curso por URL; las que vencen con el pool lleno
+    esperan su turno en el montículo. El último resultado de cada URL queda
+    en memoria y se sirve sin ir al origen.
+    
+    Cada comprobación revalida con el origen (max_age=0), así que una página
+    sin cambios cuesta un 304 o una comparación del resumen del cuerpo. Si
+    trae elementos nuevos el intervalo se multiplica por MONITOR_SPEEDUP, si
+    no por MONITOR_SLOWDOWN, y tras un error por MONITOR_ERROR_BACKOFF,
+    siempre dentro de los límites de la URL.
+    
+    Los cursores de /monitor/result son de su propio ItemHistory, no del de
+    /scrape, así que un cursor de uno no sirve en el otro.
+    
+    Crear el monitor no carga ni arranca nada: las URLs guardadas en `path`
+    se cargan con start(), que solo llama el proceso que sirve la API, para
+    que los procesos de extracción o la herramienta de replay que importan
+    este módulo no las comprueben también.
+    """
+    
+    def __init__(self, scraper, workers=MONITOR_WORKERS, max_urls=MONITOR_MAX_URLS, path=MONITOR_PATH):
+        self.scraper = scraper
+        self.workers = workers
+        self.max_urls = max_urls
+        self.path = path
+        # Historial propio: el del scraper es el de los clientes de only_new, y
+        # las comprobaciones en segundo plano no deben marcar nada como visto
+        self.history = ItemHistory()
+        self._urls = {}
+        self._heap = []
+        self._sequence = 0
+        self._running = 0
+        self._cond = threading.Condition()
+        self._pool = None
+        self._thread = None
+        self._stopped = False
+        self._loaded = False
+    
+    def start(self):
+        """Carga las URLs guardadas en disco (una sola vez); su primera comprobación arranca el planificador"""
+        if self._loaded:
+            return
+        with self._cond:
+            if self._loaded:
+                return
+            self._loaded = True
+        if self.path and os.path.exists(self.path):
+            self.load(self.path)
+    
+    @staticmethod
+    def _seconds(name, value, default):
+        """Valida un intervalo recibido en la API (None es el valor por defecto)"""
+        if value is None:
+            return default
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"'{name}' debe ser un número de segundos")
+        return float(value)
+    
+    def register(self, urls, parser=None, interval=None, min_interval=None, max_interval=None):
+        """Registra varias URLs con la misma configuración (o la actualiza) y devuelve su estado
+        
+        Las URLs nuevas se comprueban enseguida y el fichero se guarda una
+        sola vez al final. Lanza ValueError si los intervalos no son
+        válidos o si se llega a MONITOR_MAX_URLS URLs; en ese caso las
+        anteriores de la lista quedan registradas.
+        """
+        min_interval = self._seconds('min_interval', min_interval, MONITOR_MIN_INTERVAL)
+        max_interval = self._seconds('max_interval', max_interval, MONITOR_MAX_INTERVAL)
+        if not MONITOR_MIN_INTERVAL <= min_interval <= max_interval <= MONITOR_MAX_INTERVAL:
+            raise ValueError(f"Los intervalos deben cumplir {MONITOR_MIN_INTERVAL:g} <= min_interval "
+                             f"<= max_interval <= {MONITOR_MAX_INTERVAL:g} segundos")
+        interval = self._seconds('interval', interval, MONITOR_INTERVAL)
+        # Sin cargar antes las guardadas, save() las borraría del fichero
+        self.start()
         try:
-            # Realizar petición
-            response = self.session.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            
-            # Parsear HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Limpiar el HTML ANTES de buscar contenido
-            soup = self.clean_soup(soup)
-            
-            scraped_data = []
-            
-            # Selectores candidatos más específicos y ordenados por prioridad
-            candidate_selectors = [
-                'article',
-                'div[class*="post"]',
-                'div[class*="article"]',
-                'div[class*="news"]',
-                'div[class*="item"]',
-                'div[class*="card"]',
-                'div[class*="entry"]',
-                'section[class*="article"]',
-                'section[class*="post"]',
-                'li[class*="post"]',
-                'li[class*="article"]',
-                'li[class*="item"]'
-            ]
-            
-            entries = []
-            
-            # Buscar entradas usando los selectores
-            for selector in candidate_selectors:
-                try:
-                    found = soup.select(selector)
-                    if found:
-                        entries.extend(found)
-                        if len(entries) > 30:  # Limitar para evitar demasiados elementos
+            return [self._register(url, parser, interval, min_interval, max_interval) for url in urls]
+        finally:
+            self.save()
+    
+    def _register(self, url, parser, interval, min_interval, max_interval):
+        key = normalize_url(url)
+        with self._cond:
+            entry = self._urls.get(key)
+            if entry is None:
+                if len(self._urls) >= self.max_urls:
+                    raise ValueError(f"Se admiten como máximo {self.max_urls} URLs monitorizadas")
+                entry = self._urls[key] = MonitoredUrl(url, parser, interval, min_interval, max_interval)
+                self._schedule(entry, time.monotonic())
+                self._start()
+            else:
+                entry.parser = parser
+                entry.min_interval = min_interval
+                entry.max_interval = max_interval
+                entry.interval = min(max(interval, min_interval), max_interval)
+            return entry.status()
+    
+    def unregister(self, url):
+        """Deja de monitorizar una URL; devuelve False si no estaba registrada"""
+        with self._cond:
+            # Su entrada en el montículo se descarta cuando venza
+            removed = self._urls.pop(normalize_url(url), None) is not None
+        if removed:
+            self.save()
+        return removed
+    
+    def status(self, url=None):
+        """Estado de una URL (o None si no está registrada) o lista con el de todas"""
+        with self._cond:
+            if url is None:
+                return [entry.status() for entry in self._urls.values()]
+            entry = self._urls.get(normalize_url(url))
+            return entry.status() if entry is not None else None
+    
+    def result(self, url, since=None):
+        """Último resultado guardado de una URL, sin ir al origen
+        
+        Devuelve None si la URL no está registrada y un resultado sin datos
+        si aún no se ha comprobado. Con `since` (un cursor de una respuesta
+        anterior) solo se incluyen los elementos aparecidos después.
+        """
+        with self._cond:
+            entry = self._urls.get(normalize_url(url))
+            if entry is None:
+                return None
+            status = entry.status()
+            result, generations = entry.result, entry.generations
+        
+        if result is None:
+            return {"url": url, "success": False, "pending": status["last_error"] is None,
+                    "error": status["last_error"], "monitor": status}
+        
+        result = {**result, "monitor": status}
+        if since is not None:
+            since_generation = self.history.parse_cursor(since)
+            if since_generation is None:
+                result["cursor_reset"] = True
+            else:
+                data = [item for item, generation in zip(result["data"], generations) if generation > since_generation]
+                result.update(data=data, total_items=len(data), known_items=len(result["data"]) - len(data))
+        return result
+    
+    def stats(self):
+        with self._cond:
+            return {"urls": len(self._urls), "checking": self._running, "workers": self.workers}
+    
+    def _schedule(self, entry, at):
+        """Programa la próxima comprobación de una entrada (con el cerrojo tomado)"""
+        entry.next_run = at
+        self._sequence += 1
+        heapq.heappush(self._heap, (at, self._sequence, entry))
+        self._cond.notify()
+    
+    def _start(self):
+        """Arranca el planificador la primera vez que se registra una URL"""
+        if self._thread is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='monitor')
+            self._thread = threading.Thread(target=self._run, name='monitor-scheduler', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    now = time.monotonic()
+                    if self._heap and self._running < self.workers:
+                        if self._heap[0][0] <= now:
                             break
-                except:
+                        self._cond.wait(self._heap[0][0] - now)
+                    else:
+                        self._cond.wait()
+                
+                at, _, entry = heapq.heappop(self._heap)
+                # Entradas obsoletas: URL eliminada o reprogramada
+                if self._urls.get(normalize_url(entry.url)) is not entry or entry.next_run != at or entry.running:
                     continue
+                entry.running = True
+                self._running += 1
             
-            # Si no se encontraron entradas específicas, buscar en contenedor principal
-            if not entries:
-                main_containers = soup.select('main, #main, #content, .content, .main, .container')
-                for container in main_containers:
-                    links = container.find_all('a', href=True)
-                    for link in links[:20]:  # Limitar a 20 enlaces
-                        title = self.extract_text_content(link)
-                        if self.is_meaningful_title(title):
-                            full_url = urljoin(url, link['href']).strip()
-                            if self.is_valid_url(full_url):
-                                # Limpiar URL de parámetros innecesarios
-                                full_url = full_url.split('#')[0]
-                                scraped_data.append({
-                                    "title": title,
-                                    "link": full_url
-                                })
+            self._pool.submit(self._check, entry)
+    
+    def _check(self, entry):
+        """Comprueba una URL, guarda el resultado y ajusta su intervalo"""
+        start_time = time.time()
+        info = {}
+        error = None
+        try:
+            with self.scraper.host_semaphore(entry.url):
+                data = self.scraper.scrape_website(entry.url, info, parser=entry.parser, max_age=0)
+            generations, _, current = self.history.observe(entry.url, data)
+            info['cursor'] = self.history.cursor(current)
+            fingerprints = frozenset(item_fingerprint(item) for item in data)
+        except Exception as e:
+            error = e
+        
+        with self._cond:
+            entry.checks += 1
+            entry.last_checked = start_time
+            if error is not None:
+                outcome, factor = 'error', MONITOR_ERROR_BACKOFF
+                entry.errors += 1
+                entry.last_error = str(error)
             else:
-                # Procesar entradas encontradas
-                for entry in entries:
-                    title = self.get_best_title(entry)
-                    
-                    if title and self.is_meaningful_title(title):
-                        # Buscar enlace en la entrada
-                        link_element = entry.find('a', href=True)
-                        
-                        if link_element:
-                            link = urljoin(url, link_element['href']).strip()
-                            link = link.split('#')[0]  # Eliminar anclas
-                            
-                            if self.is_valid_url(link):
-                                scraped_data.append({
-                                    "title": title,
-                                    "link": link
-                                })
-            
-            # Eliminar duplicados y filtrar contenido CSS
-            unique_data = []
-            seen = set()
-            
-            for item in scraped_data:
-                # Verificar que el título no contenga CSS
-                if self.contains_css_like_content(item['title']):
-                    continue
-                
-                # Crear clave única
-                key = (item['title'].lower().strip(), item['link'])
-                
-                if key not in seen and len(item['title']) > 5:
-                    unique_data.append(item)
-                    seen.add(key)
-            
-            # Ordenar por longitud de título (títulos más descriptivos primero)
-            unique_data.sort(key=lambda x: len(x['title']), reverse=True)
-            
-            # Limitar resultados
-            return unique_data[:30]
+                if entry.fingerprints is None:
+                    outcome, factor = 'first', 1.0
+                elif not fingerprints <= entry.fingerprints:
+                    outcome, factor = 'changed', MONITOR_SPEEDUP
+                    entry.changes += 1
+                    entry.last_changed = start_time
+                else:
+                    outcome, factor = 'unchanged', MONITOR_SLOWDOWN
+                entry.last_error = None
+                entry.fingerprints = fingerprints
+                entry.generations = generations
+                entry.result = {
+                    "url": entry.url,
+                    "success": True,
+                    "data": data,
+                    "total_items": len(data),
+                    **scrape_metadata(info),
+                    "processing_time": round(time.time() - start_time, 2),
+                }
             
-        except requests.exceptions.Timeout:
-            raise Exception("Timeout: La página tardó demasiado en responder")
-        except requests.exceptions.ConnectionError:
-            raise Exception("Error de conexión: No se pudo conectar con la página")
-        except requests.exceptions.HTTPError as e:
-            raise Exception(f"Error HTTP: {e.response.status_code}")
-        except Exception as e:
-            raise Exception(f"Error inesperado: {str(e)}")
+            entry.interval = min(max(entry.interval * factor, entry.min_interval), entry.max_interval)
+            entry.running = False
+            self._running -= 1
+            if self._urls.get(normalize_url(entry.url)) is entry:
+                jitter = random.uniform(1 - MONITOR_JITTER, 1 + MONITOR_JITTER)
+                self._schedule(entry, time.monotonic() + entry.interval * jitter)
+            else:
+                self._cond.notify()
+        
+        self.scraper.metrics.inc('scraper_monitor_checks_total', result=outcome)
+    
+    def save(self, path=None):
+        """Guarda en disco las URLs registradas y su configuración, de forma atómica"""
+        path = path or self.path
+        if not path:
+            return
+        
+        with self._cond:
+            data = json.dumps([entry.config() for entry in self._urls.values()], ensure_ascii=False)
+        
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    
+    def load(self, path):
+        """Vuelve a registrar las URLs guardadas previamente en disco"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                configs = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        # Sin guardar tras cada URL para no pisar el fichero a medio cargar
+        for config in configs:
+            try:
+                self._register(config['url'], config.get('parser'), float(config['interval']),
+                               float(config['min_interval']), float(config['max_interval']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    
+    def close(self):
+        """Detiene el planificador; las comprobaciones en curso terminan"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
 
-# Instancia global del scraper
-scraper = WebScraper()
+# Límite de tiempo (time.monotonic) de la descarga en curso en este hilo, lo fija WebScraper.fetch
+_fetch_deadline = contextvars.ContextVar('fetch_deadline', default=None)
 
-@app.route('/scrape', methods=['GET'])
-def scrape_website():
-    """Endpoint principal para el scraping"""
-    url_to_scrape = request.args.get('url')
+class DeadlineRetry(Retry):
+    """Retry que no reintenta ni espera más allá del límite de tiempo de la descarga
     
-    if not url_to_scrape:
-        return jsonify({"error": "El parámetro 'url' es obligatorio."}), 400
+    Sin descarga en curso (fuera de WebScraper.fetch) se comporta como Retry.
+    """
     
-    # Validar URL
-    if not scraper.is_valid_url(url_to_scrape):
-        return jsonify({"error": "La URL proporcionada no es válida."}), 400
+    def remaining(self):
+        deadline = _fetch_deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
     
-    try:
-        # Realizar scraping
-        start_time = time.time()
-        data = scraper.scrape_website(url_to_scrape)
-        end_time = time.time()
+    def increment(self, *args, **kwargs):
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            # Agota los reintentos para que falle como al llegar al máximo (con
+            # el increment de Retry: el de esta clase volvería a entrar aquí)
+            return Retry.increment(self.new(total=0), *args, **kwargs)
+        return super().increment(*args, **kwargs)
+    
+    def get_backoff_time(self):
+        remaining = self.remaining()
+        backoff = super().get_backoff_time()
+        return backoff if remaining is None else max(0.0, min(backoff, remaining))
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        remaining = self.remaining()
+        if retry_after is None or remaining is None:
+            return retry_after
+        return max(0.0, min(retry_after, remaining))
+
+class WebScraper:
+    def __init__(self, max_workers=BATCH_MAX_WORKERS, per_host_limit=BATCH_PER_HOST_LIMIT, cache=None,
+                 parser=DEFAULT_PARSER, max_bytes=FETCH_MAX_BYTES, fetch_deadline=FETCH_DEADLINE,
+                 profiles=None, extract_processes=EXTRACT_PROCESSES, store=None):
+        self.session = requests.Session()
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.parser = resolve_parser(parser)
+        self.max_bytes = max_bytes
+        self.fetch_deadline = fetch_deadline
+        self.cache = cache if cache is not None else ResponseCache()
+        self.metrics = Metrics()
+        self.flights = SingleFlight()
+        self.profiles = profiles if profiles is not None else DomainProfiles()
+        self.structured = STRUCTURED_ENABLED
+        self.history = ItemHistory()
+        # Copia en disco de cada página descargada: con store=None la crea start()
+        # si hay SCRAPER_STORE_PATH; False la desactiva
+        self.store = store or None
+        self._store_from_env = store is None
+        self._start_lock = threading.Lock()
+        self.robots = RobotsCache()
+        self.crawl_delay = CRAWL_DEFAULT_DELAY
+        self.crawl_deadline = CRAWL_DEADLINE
+        self.parse_max_nodes = PARSE_MAX_NODES
+        self.parse_max_depth = PARSE_MAX_DEPTH
+        self.memory = MemoryProfile()
+        # Codificación detectada por host, para las páginas que no la declaran
+        self._host_encodings = OrderedDict()
+        self._host_encodings_lock = threading.Lock()
         
-        return jsonify({
-            "success": True,
-            "data": data,
-            "total_items": len(data),
-            "processing_time": round(end_time - start_time, 2),
-            "url": url_to_scrape
-        })
+        # Pool de procesos opcional para parsear y extraer fuera del GIL
+        self.extract_processes = extract_processes
+        self._extract_pool = None
+        self._extract_pool_lock = threading.Lock()
         
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": "Error al procesar la página",
-            "details": str(e),
-            "url": url_to_scrape
-        }), 500
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Endpoint de salud del servicio"""
-    return jsonify({"status": "healthy", "service": "web-scraper"})
-
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({"error": "Endpoint no encontrado"}), 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({"error": "Error interno del servidor"}), 500
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False), text_lower):
-            return True
+        # Pool de hilos compartido para los lotes y semáforos por host
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scraper')
+        self._host_semaphores = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_limit))
+        self._host_lock = threading.Lock()
+        
+        # Configurar reintentos automáticos
+        # Agotados los reintentos por estado se devuelve la última respuesta,
+        # y raise_for_status la convierte en un error HTTP (como en la versión asíncrona)
+        retry_strategy = DeadlineRetry(
+            total=RETRY_TOTAL,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False,
+        )
+        # El pool de conexiones debe admitir tantas conexiones como hilos del lote
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=max_workers,
+            pool_maxsize=max_workers,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # Headers más realistas
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        }
+    
+    def start(self):
+        """Activa lo que solo debe hacer el proceso que sirve la API (ver start_service)"""
+        with self._start_lock:
+            if self._store_from_env and self.store is None and STORE_PATH:
+                self.store = PageStore()
+            self._store_from_env = False
+        self.profiles.start()
+    
+    # Elementos a eliminar completamente
+    UNWANTED_TAGS = frozenset([
+        'style', 'script', 'noscript', 'iframe', 'embed', 'object',
+        'svg', 'canvas', 'audio', 'video', 'source', 'track',
+        'meta', 'link', 'base', 'head', 'title', 'form', 'input',
+        'button', 'textarea', 'select', 'option', 'label', 'fieldset',
+        'legend', 'nav', 'aside', 'footer', 'header'
+    ])
+    
+    def clean_soup(self, soup):
+        """Limpia el HTML de elementos innecesarios de forma más agresiva"""
+        
+        # Un único recorrido en postorden: cada nodo se elimina, se conserva o
+        # pierde sus atributos, y su texto se construye a partir del texto ya
+        # calculado de sus hijos en lugar de volver a recorrer el subárbol
+        to_remove = []
+        stack = [(soup, iter(list(soup.contents)), [])]
+        
+        while stack:
+            node, children, parts = stack[-1]
+            child = next(children, None)
+            
+            if child is not None:
+                if isinstance(child, Tag):
+                    if child.name in self.UNWANTED_TAGS:
+                        child.decompose()
+                        continue
+                    
+                    # Solo mantener href para enlaces
+                    if child.name == 'a' and child.get('href'):
+                        child.attrs = {'href': child['href']}
+                    else:
+                        child.attrs = {}
+                    stack.append((child, iter(list(child.contents)), []))
+                elif isinstance(child, Comment):
+                    # Eliminar comentarios HTML
+                    child.extract()
+                elif type(child) in MAIN_CONTENT_STRING_TYPES:
+                    stripped = child.strip()
+                    if stripped:
+                        parts.append(stripped)
+                continue
+            
+            stack.pop()
+            if node is soup:
+                break
+            
+            # Equivalente a get_text(strip=True) sobre el subárbol del nodo
+            text = parts[0] if len(parts) == 1 else ''.join(parts)
+            if text:
+                stack[-1][2].append(text)
+            
+            # Las etiquetas con tipos de texto propios (p. ej. <template>)
+            # calculan su texto como lo haría BeautifulSoup
+            if node.interesting_string_types not in (None, MAIN_CONTENT_STRING_TYPES):
+                text = node.get_text(strip=True)
             
-        return False
+            # Si el elemento contiene solo espacios en blanco o CSS, eliminarlo
+            if not text or self.contains_css_like_content(text):
+                to_remove.append(node)
+        
+        # Los padres aparecen después de sus hijos: se eliminan primero y los
+        # descendientes que ya cayeron con ellos se omiten
+        for tag in reversed(to_remove):
+            if not tag.decomposed:
+                tag.decompose()
+        
+        return soup
     
-    def extract_text_content(self, element):
+    def contains_css_like_content(self, text):
+        """Detecta si el texto contiene CSS o contenido no deseado"""
+        # Los textos cortos se repiten mucho (títulos, enlaces, bloques con un
+        # único hijo), así que su veredicto se guarda en una caché LRU
+        if len(text) <= CSS_CACHE_MAX_LENGTH:
+            return _detect_css_cached(text)
+        return _detect_css(text)
+    
+    def element_text(self, element, text_cache):
+        """Texto visible de un elemento, equivalente a get_text(separator=' ', strip=True)
+        
+        El texto de cada nodo se calcula una sola vez por página a partir del
+        de sus hijos y se guarda en `text_cache` (indexado por id del nodo).
+        """
+        if element.interesting_string_types not in (None, MAIN_CONTENT_STRING_TYPES):
+            return element.get_text(separator=' ', strip=True)
+        
+        cached = text_cache.get(id(element))
+        if cached is not None:
+            return cached
+        
+        # Postorden iterativo para no depender de la profundidad del árbol
+        stack = [(element, iter(element.contents), [])]
+        while stack:
+            node, children, parts = stack[-1]
+            for child in children:
+                if isinstance(child, Tag):
+                    text = text_cache.get(id(child))
+                    if text is None:
+                        stack.append((child, iter(child.contents), []))
+                        break
+                    if text:
+                        parts.append(text)
+                elif type(child) in MAIN_CONTENT_STRING_TYPES:
+                    stripped = child.strip()
+                    if stripped:
+                        parts.append(stripped)
+            else:
+                stack.pop()
+                text = text_cache[id(node)] = ' '.join(parts)
+                if stack and text:
+                    stack[-1][2].append(text)
+        
+        return text_cache[id(element)]
+    
+    def extract_text_content(self, element, text_cache=None):
         """Extrae texto limpio de un elemento"""
         if not element:
             return ""
         
-        # Obtener texto y limpiar espacios
-        text = element.get_text(separator=' ', strip=True)
-        # Eliminar espacios múltiples y caracteres especiales
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[^\w\s\-.,;:!?áéíóúüñÁÉÍÓÚÜÑ]', '', text)
+        # Obtener solo el texto visible, sin HTML
+        if text_cache is None:
+            text = element.get_text(separator=' ', strip=True)
+        else:
+            text = self.element_text(element, text_cache)
+        
+        # Filtrar si contiene CSS
+        if self.contains_css_like_content(text):
+            return ""
+        
+        # Limpiar espacios múltiples y caracteres especiales
+        text = re.sub(r'\s+', ' ', text)
+        
+        # Mantener solo caracteres alfanuméricos, espacios y puntuación básica
+        text = re.sub(r'[^\w\s\-.,;:!?¿¡áéíóúüñÁÉÍÓÚÜÑ()"\']', ' ', text)
+        text = re.sub(r'\s+', ' ', text)  # Limpiar espacios múltiples otra vez
+        
         return text.strip()
     
     def is_valid_url(self, url):
@@ -392,155 +1825,1224 @@ if __name__ == '__main__':
         
         return True
     
-    def get_best_title(self, entry):
-        """Obtiene el mejor título de un elemento"""
+    # Etiquetas que get_best_title examina, por orden de prioridad
+    HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+    TEXT_TAGS = ('span', 'div', 'p')
+    TITLE_SOURCE_TAGS = HEADING_TAGS + ('a',) + TEXT_TAGS
+    
+    # Selectores candidatos más específicos y ordenados por prioridad
+    CANDIDATE_SELECTORS = (
+        'article',
+        'div[class*="post"]',
+        'div[class*="article"]',
+        'div[class*="news"]',
+        'div[class*="item"]',
+        'div[class*="card"]',
+        'div[class*="entry"]',
+        'section[class*="article"]',
+        'section[class*="post"]',
+        'li[class*="post"]',
+        'li[class*="article"]',
+        'li[class*="item"]'
+    )
+    
+    # Contenedores principales donde buscar enlaces si no hay entradas
+    MAIN_CONTAINERS = 'main, #main, #content, .content, .main, .container'
+    
+    # Estrategias de búsqueda del título, por orden de prioridad
+    TITLE_STRATEGIES = ('header', 'link', 'text')
+    
+    def _title_candidates(self, strategy, by_tag, text_cache):
+        """Candidatos a título que produce una estrategia"""
         title_candidates = []
         
-        # Buscar en diferentes elementos por orden de prioridad
-        for selector in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            elements = entry.find_all(selector)
-            for elem in elements:
-                text = self.extract_text_content(elem)
-                if self.is_meaningful_title(text):
-                    title_candidates.append((text, len(text)))
+        if strategy == 'header':
+            # Buscar en diferentes elementos por orden de prioridad
+            for selector in self.HEADING_TAGS:
+                for elem in by_tag[selector]:
+                    text = self.extract_text_content(elem, text_cache)
+                    if self.is_meaningful_title(text):
+                        title_candidates.append((text, len(text)))
         
-        # Si no hay títulos en headers, buscar en enlaces
-        if not title_candidates:
-            links = entry.find_all('a', href=True)
-            for link in links:
-                text = self.extract_text_content(link)
+        elif strategy == 'link':
+            # Buscar en enlaces
+            for link in by_tag['a']:
+                if link.get('href') is None:
+                    continue
+                text = self.extract_text_content(link, text_cache)
                 if self.is_meaningful_title(text):
                     title_candidates.append((text, len(text)))
         
-        # Si aún no hay títulos, buscar en elementos con texto
-        if not title_candidates:
-            for tag in ['span', 'div', 'p']:
-                elements = entry.find_all(tag)
-                for elem in elements:
-                    text = self.extract_text_content(elem)
+        else:
+            # Buscar en elementos con texto
+            for tag in self.TEXT_TAGS:
+                for elem in by_tag[tag]:
+                    text = self.extract_text_content(elem, text_cache)
                     if self.is_meaningful_title(text) and len(text) < 200:
                         title_candidates.append((text, len(text)))
         
-        # Retornar el título más apropiado (ni muy corto ni muy largo)
-        if title_candidates:
-            # Ordenar por longitud y tomar uno de longitud media
-            title_candidates.sort(key=lambda x: x[1])
-            mid_index = len(title_candidates) // 2
-            return title_candidates[mid_index][0]
+        return title_candidates
+    
+    def get_best_title(self, entry, text_cache=None):
+        """Obtiene el mejor título de un elemento
+        
+        Las estrategias de TITLE_STRATEGIES se prueban por orden hasta que
+        una encuentra algún candidato.
+        """
+        # Un único recorrido del subárbol, agrupando los elementos por etiqueta
+        # en orden de documento
+        by_tag = {tag: [] for tag in self.TITLE_SOURCE_TAGS}
+        for elem in entry.find_all(self.TITLE_SOURCE_TAGS):
+            by_tag[elem.name].append(elem)
+        
+        for strategy in self.TITLE_STRATEGIES:
+            title_candidates = self._title_candidates(strategy, by_tag, text_cache)
+            
+            # Retornar el título más apropiado (ni muy corto ni muy largo)
+            if title_candidates:
+                # Ordenar por longitud y tomar uno de longitud media
+                title_candidates.sort(key=lambda x: x[1])
+                mid_index = len(title_candidates) // 2
+                return title_candidates[mid_index][0]
         
         return None
     
-    def scrape_website(self, url):
-        """Método principal de scraping"""
+    def resolve_encoding(self, content, url, content_type=None, info=None):
+        """Codificación con la que decodificar una página descargada
+        
+        Se usa la declarada (BOM, Content-Type o <meta charset>, ver
+        sniff_encoding); si no hay, la última detectada para el mismo host, y
+        solo en último caso la detección completa de UnicodeDammit, cuyo
+        resultado se recuerda para el host. En `info` se anotan la
+        codificación y de dónde salió ('bom', 'header', 'meta', 'host' o
+        'detect').
+        """
+        encoding, source = sniff_encoding(content, content_type)
+        host = urlparse(url).netloc.lower()
+        
+        if encoding is None:
+            with self._host_encodings_lock:
+                encoding = self._host_encodings.get(host)
+                if encoding is not None:
+                    self._host_encodings.move_to_end(host)
+                    source = 'host'
+        
+        if encoding is None:
+            encoding, source = UnicodeDammit(content, is_html=True).original_encoding, 'detect'
+            if encoding is not None:
+                with self._host_encodings_lock:
+                    self._host_encodings[host] = encoding
+                    while len(self._host_encodings) > ENCODING_CACHE_MAX_HOSTS:
+                        self._host_encodings.popitem(last=False)
+        
+        if info is not None:
+            info['encoding'] = encoding
+            info['encoding_source'] = source
+        self.metrics.inc('scraper_charset_total', source=source)
+        return encoding
+    
+    def decode_content(self, content, encoding=None):
+        """Convierte los bytes descargados en texto
+        
+        Con `encoding` (la de resolve_encoding) se decodifica directamente; sin
+        ella se busca un BOM o un <meta charset> al principio del documento.
+        Si nada la declara o la declarada no sirve para estos bytes, se
+        recurre a la detección completa de UnicodeDammit.
+        """
+        if isinstance(content, str):
+            return content
+        if encoding is None:
+            encoding, _ = sniff_encoding(content)
+        if encoding is not None:
+            try:
+                return content.decode(encoding)
+            except (UnicodeDecodeError, LookupError):
+                pass
+        
+        dammit = UnicodeDammit(content, is_html=True)
+        if dammit.unicode_markup is None:
+            return content
+        return dammit.unicode_markup
+    
+    def extract_items(self, content, url, parser=None, timings=None, links=None, encoding=None, info=None):
+        """Parsea el HTML descargado y extrae los títulos y enlaces
+        
+        Si se pasa el diccionario `timings`, se rellena con la duración en
+        segundos de cada etapa (decode, parse, clean, select, extract, dedupe).
+        Con un pool de procesos configurado, el trabajo se hace en otro
+        proceso y el tiempo de envío y espera se anota como etapa 'pool'.
+        Si se pasa la lista `links`, se añaden a ella todos los enlaces de la
+        página (para el modo rastreo). `encoding` es la codificación resuelta
+        con resolve_encoding; sin ella se detecta durante la decodificación.
+        En `info` se anota si el árbol se recortó por los límites de tamaño
+        (`info['parse_limited']`) y, con el perfilado de memoria activo, el
+        pico de memoria por etapa (`info['memory']`).
+        """
+        if timings is None:
+            timings = {}
+        parser = parser or self.parser
+        
+        # Con un perfil aprendido para el dominio se prueban primero solo sus
+        # selectores; la búsqueda completa queda para cuando no dan resultado
+        domain = urlparse(url).netloc.lower()
+        profile = self.profiles.get(domain)
+        # Un perfil sin selectores (guardado por versiones anteriores) no acota nada
+        if profile is not None and not profile['selectors']:
+            profile = None
+        
+        stats = {}
+        pool = self._get_extract_pool()
+        if pool is None:
+            items, learned, profile_hit = self.run_extraction(content, url, parser, timings, profile, links, encoding,
+                                                              stats)
+        else:
+            pool_start = time.perf_counter()
+            try:
+                items, learned, profile_hit, worker_timings, worker_links, stats = pool.submit(
+                    extract_in_worker, content, url, parser, profile, links is not None, encoding).result()
+            except BrokenProcessPool:
+                # Un proceso murió (p. ej. por falta de memoria): se recrea el pool
+                self._reset_extract_pool(pool)
+                raise Exception("El proceso de extracción terminó inesperadamente")
+            timings.update(worker_timings)
+            if links is not None:
+                links.extend(worker_links)
+            timings['pool'] = max(0.0, time.perf_counter() - pool_start - sum(worker_timings.values()))
+        
+        limited = stats.get('limited')
+        if limited:
+            self.metrics.inc('scraper_parse_limited_total', reason=limited)
+        if 'memory' in stats:
+            self.memory.record(domain, url, stats['memory'])
+        if info is not None:
+            if limited:
+                info['parse_limited'] = limited
+            if 'memory' in stats:
+                info['memory'] = stats['memory']
+        
+        if profile is not None:
+            self.metrics.inc('scraper_profile_results_total', result='hit' if profile_hit else 'miss')
+        # Un árbol recortado no es representativo del dominio: no se aprende de él.
+        # Los selectores se suman a los ya aprendidos, en el orden de CANDIDATE_SELECTORS,
+        # para que una página de otro tipo no deje al perfil sin los de la portada
+        if items and learned and not limited:
+            selectors = set(learned['selectors']).union(profile['selectors'] if profile else ())
+            self.profiles.record(domain, {"selectors": [selector for selector in self.CANDIDATE_SELECTORS
+                                                        if selector in selectors]})
+        
+        return items
+    
+    def run_extraction(self, content, url, parser, timings, profile=None, links=None, encoding=None, stats=None):
+        """Decodifica, parsea, limpia y extrae los elementos de una página
+        
+        No depende del estado compartido del scraper, así que puede ejecutarse
+        en un proceso del pool. Devuelve los elementos, el perfil aprendido y
+        si el perfil recibido dio resultados. Si se pasa el diccionario
+        `stats`, se anota en él si el árbol se recortó (`stats['limited']`)
+        y, con tracemalloc activo, el pico de memoria por etapa
+        (`stats['memory']`).
+        """
+        timer = StageTimer(timings, {} if stats is not None else None)
+        
+        markup = self.decode_content(content, encoding)
+        timer.lap('decode')
+        
+        # Parsear HTML
+        soup = self.parse_html(markup, parser)
+        timer.lap('parse')
+        if stats is not None and soup.limited:
+            stats['limited'] = soup.limited
+        
+        # Los enlaces se recogen antes de limpiar: la paginación y las
+        # secciones suelen estar en nav, header o footer
+        if links is not None:
+            links.extend(self.collect_links(soup, url))
+            timer.lap('links')
+        
+        # Limpiar el HTML ANTES de buscar contenido
+        soup = self.clean_soup(soup)
+        timer.lap('clean')
+        
+        # Texto de cada nodo calculado una sola vez para toda la página
+        text_cache = {}
+        unique_data = []
+        learned = None
+        
+        if profile is not None:
+            scraped_data, learned = self.find_items(soup, url, timer, text_cache, profile)
+            unique_data = self.dedupe_items(scraped_data)
+            timer.lap('dedupe')
+        profile_hit = bool(unique_data)
+        
+        if not unique_data:
+            scraped_data, learned = self.find_items(soup, url, timer, text_cache)
+            unique_data = self.dedupe_items(scraped_data)
+            timer.lap('dedupe')
+        
+        if stats is not None and timer.memory is not None:
+            stats['memory'] = timer.memory
+        
+        # Limitar resultados
+        return unique_data[:30], learned, profile_hit
+    
+    def parse_html(self, markup, parser):
+        """Parsea el HTML con los límites de tamaño del árbol (ver LimitedSoup)"""
+        return LimitedSoup(markup, parser, self.parse_max_nodes, self.parse_max_depth)
+    
+    def collect_links(self, soup, url):
+        """Enlaces únicos de la página, absolutos y sin ancla, en orden de aparición"""
+        links = []
+        seen = set()
+        for link_element in soup.find_all('a', href=True):
+            if 'nofollow' in (link_element.get('rel') or ()):
+                continue
+            link = urljoin(url, link_element['href']).strip()
+            link = link.split('#')[0]  # Eliminar anclas
+            if link not in seen and self.is_valid_url(link):
+                seen.add(link)
+                links.append(link)
+                if len(links) >= CRAWL_MAX_LINKS:
+                    break
+        return links
+    
+    def find_structured_items(self, content, url):
+        """Busca elementos en las fuentes estructuradas del propio documento
+        
+        Trabaja sobre los bytes descargados, sin decodificar ni parsear el
+        HTML. Si el documento es un feed se extraen sus entradas; si no, se
+        prueba el JSON-LD. Devuelve (elementos, fuente, feeds anunciados);
+        sin elementos suficientes, la fuente es None y la lista de feeds
+        indica dónde seguir buscando.
+        """
+        if FEED_DOCUMENT_REGEX.match(content, 3 if content.startswith(b'\xef\xbb\xbf') else 0):
+            return self.parse_feed(content, url), 'feed', []
+        
+        items = self.parse_jsonld(content, url)
+        if len(items) >= STRUCTURED_MIN_ITEMS:
+            return items, 'jsonld', []
+        
+        return [], None, self.find_feed_urls(content, url)
+    
+    def find_feed_urls(self, content, url):
+        """URLs de los feeds RSS/Atom anunciados con <link rel="alternate">"""
+        feed_urls = []
+        for tag in LINK_TAG_REGEX.findall(content, 0, FEED_HEAD_BYTES):
+            attrs = {
+                name.decode('ascii').lower(): html.unescape((double or single or bare).decode('utf-8', errors='replace'))
+                for name, double, single, bare in TAG_ATTR_REGEX.findall(tag)
+            }
+            if 'alternate' not in attrs.get('rel', '').lower().split():
+                continue
+            if attrs.get('type', '').lower().encode() in FEED_TYPES and attrs.get('href'):
+                feed_urls.append(urljoin(url, attrs['href'].strip()))
+        return feed_urls
+    
+    def parse_jsonld(self, content, url):
+        """Elementos de los bloques JSON-LD (ItemList y artículos) de la página"""
+        pairs = []
+        for block in JSONLD_REGEX.findall(content):
+            try:
+                data = json.loads(block)
+            except ValueError:
+                continue
+            pairs.extend(jsonld_entries(data))
+        return self.structured_items(pairs, url)
+    
+    def parse_feed(self, content, url):
+        """Elementos de un feed RSS 1.0/2.0 o Atom"""
+        # Sin DTD no hay entidades que expandir; un feed que las declara se descarta
+        if b'<!ENTITY' in content:
+            return []
         try:
-            # Realizar petición
-            response = self.session.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
+            root = ElementTree.fromstring(content)
+        except ElementTree.ParseError:
+            return []
+        
+        pairs = []
+        for element in root.iter():
+            if xml_local_name(element.tag) not in ('item', 'entry'):
+                continue
+            title = link = None
+            for child in element:
+                name = xml_local_name(child.tag)
+                if name == 'title':
+                    title = ''.join(child.itertext())
+                elif name == 'link' and link is None:
+                    # Atom: <link rel="alternate" href="..."/>; RSS: <link>...</link>
+                    if child.get('href'):
+                        if child.get('rel', 'alternate') == 'alternate':
+                            link = child.get('href')
+                    else:
+                        link = child.text
+            pairs.append((title, link))
+        return self.structured_items(pairs, url)
+    
+    def structured_items(self, pairs, url):
+        """Convierte pares (título, enlace) en elementos con los mismos filtros que el HTML"""
+        scraped_data = []
+        for title, link in pairs:
+            if not isinstance(title, str) or not isinstance(link, str):
+                continue
+            title = ' '.join(html.unescape(title).split())
+            if not self.is_meaningful_title(title):
+                continue
+            link = urljoin(url, link.strip()).strip()
+            link = link.split('#')[0]  # Eliminar anclas
+            if self.is_valid_url(link):
+                scraped_data.append({"title": title, "link": link})
+        return self.dedupe_items(scraped_data)[:30]
+    
+    def extract_structured(self, content, url, deadline, timings):
+        """Intenta obtener los elementos de un feed o de JSON-LD antes que del HTML
+        
+        Si la página solo anuncia un feed, se descarga (con el mismo límite
+        de tiempo que la página). Devuelve (elementos, fuente), o (None,
+        'html') si no hay fuente estructurada con elementos suficientes.
+        """
+        timer = StageTimer(timings)
+        items, source, feed_urls = self.find_structured_items(content, url)
+        timer.lap('structured')
+        
+        if source == 'feed':
+            return items, source
+        
+        if not items and feed_urls:
+            try:
+                response = self.fetch(feed_urls[0], self.headers, deadline)
+                self.metrics.inc('scraper_upstream_responses_total', status=str(response.status_code))
+                if response.status_code >= 400:
+                    response.close()
+                response.raise_for_status()
+                feed_info = {}
+                feed = self.read_body(response, deadline, feed_info)
+                self.metrics.inc('scraper_downloaded_bytes_total', len(feed))
+                if self.store is not None:
+                    self.store.put(feed_urls[0], response.status_code, response.headers, feed, feed_info['truncated'])
+                items, source = self.parse_feed(feed, feed_urls[0]), 'feed'
+            except (requests.exceptions.RequestException, ReadTimeoutError):
+                # Sin feed se sigue con el HTML que ya se tiene
+                items = []
+            timer.lap('feed')
+        
+        if len(items) >= STRUCTURED_MIN_ITEMS:
+            return items, source
+        return None, 'html'
+    
+    def reextract(self, content, url, parser=None, feeds=None, content_type=None):
+        """Vuelve a extraer un cuerpo ya descargado, sin red ni perfiles (para replay)
+        
+        Sigue el mismo orden que scrape_website: feed o JSON-LD del propio
+        documento, feed anunciado si está en `feeds` (URL -> cuerpo) y, si
+        no, la extracción heurística completa, decodificando con el charset
+        de `content_type` si lo hay. Devuelve (elementos, fuente).
+        """
+        parser = resolve_parser(parser) if parser else self.parser
+        if self.structured:
+            items, source, feed_urls = self.find_structured_items(content, url)
+            if source is not None:
+                return items, source
+            if feed_urls and feeds and feed_urls[0] in feeds:
+                items = self.parse_feed(feeds[feed_urls[0]], feed_urls[0])
+                if len(items) >= STRUCTURED_MIN_ITEMS:
+                    return items, 'feed'
+        
+        encoding = self.resolve_encoding(content, url, content_type)
+        items, _, _ = self.run_extraction(content, url, parser, {}, encoding=encoding)
+        return items, 'html'
+    
+    def _get_extract_pool(self):
+        """Devuelve el pool de procesos de extracción, creándolo la primera vez"""
+        if self.extract_processes <= 0:
+            return None
+        
+        # Se crea en el primer uso para que cada worker de gunicorn tenga el suyo
+        with self._extract_pool_lock:
+            if self._extract_pool is None:
+                self._extract_pool = ProcessPoolExecutor(
+                    max_workers=self.extract_processes,
+                    mp_context=multiprocessing.get_context(EXTRACT_START_METHOD),
+                    initializer=init_extract_worker,
+                )
+            return self._extract_pool
+    
+    def _reset_extract_pool(self, pool):
+        with self._extract_pool_lock:
+            if self._extract_pool is pool:
+                self._extract_pool = None
+        pool.shutdown(wait=False)
+    
+    def find_items(self, soup, url, timer, text_cache, profile=None):
+        """Busca las entradas de la página y extrae su título y enlace
+        
+        Sin perfil se prueban todos los selectores candidatos y, si no hay
+        entradas, los contenedores principales. Con perfil solo se usan los
+        selectores que encontraron nodos, así que la misma página da el
+        mismo resultado con y sin perfil. Las estrategias de título se
+        prueban siempre en el orden de TITLE_STRATEGIES. Devuelve los
+        elementos encontrados (sin deduplicar) y el perfil que los produjo,
+        o None si no hay selectores que aprender.
+        """
+        scraped_data = []
+        
+        # Con perfil no se usan los contenedores principales: si sus selectores
+        # no dan resultado, run_extraction repite la búsqueda completa
+        selectors = self.CANDIDATE_SELECTORS if profile is None else profile['selectors']
+        use_fallback = profile is None
+        
+        entries = []
+        
+        # Nodos encontrados (cada uno con el primer selector que lo encontró) e
+        # ids de todos sus ancestros: un nodo que contiene a otro encontrado es
+        # un envoltorio y se descarta, así quedan las entradas más internas
+        matched = []
+        matched_ids = set()
+        ancestor_ids = set()
+        
+        # Buscar entradas usando los selectores
+        for selector in selectors:
+            try:
+                found = soup.select(selector)
+            except:
+                continue
             
-            # Parsear HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Limpiar el HTML
-            soup = self.clean_soup(soup)
-            
-            scraped_data = []
-            
-            # Selectores candidatos más específicos y ordenados por prioridad
-            candidate_selectors = [
-                'article',
-                'div[class*="post"]',
-                'div[class*="article"]',
-                'div[class*="news"]',
-                'div[class*="item"]',
-                'div[class*="card"]',
-                'div[class*="entry"]',
-                'section[class*="article"]',
-                'section[class*="post"]',
-                'li[class*="post"]',
-                'li[class*="article"]',
-                'li[class*="item"]',
-                '.post', '.article', '.news-item', '.blog-post',
-                '.content-item', '.story', '.entry'
-            ]
-            
-            entries = []
-            
-            # Buscar entradas usando los selectores
-            for selector in candidate_selectors:
-                try:
-                    found = soup.select(selector)
-                    if found:
-                        entries.extend(found)
-                        if len(entries) > 50:  # Limitar para evitar demasiados elementos
-                            break
-                except:
+            for node in found:
+                if id(node) in matched_ids:
                     continue
+                matched.append((node, selector))
+                matched_ids.add(id(node))
+                ancestor_ids.update(id(parent) for parent in node.parents)
             
-            # Si no se encontraron entradas específicas, buscar en contenedor principal
-            if not entries:
-                main_containers = soup.select('main, #main, #content, .content, .main, .container')
-                for container in main_containers:
-                    links = container.find_all('a', href=True)
-                    for link in links[:30]:  # Limitar a 30 enlaces
-                        title = self.extract_text_content(link)
-                        if self.is_meaningful_title(title):
-                            full_url = urljoin(url, link['href']).strip()
-                            if self.is_valid_url(full_url):
-                                # Limpiar URL de parámetros innecesarios
-                                full_url = full_url.split('#')[0]
-                                scraped_data.append({
-                                    "title": title,
-                                    "link": full_url
-                                })
-            else:
-                # Procesar entradas encontradas
-                for entry in entries:
-                    title = self.get_best_title(entry)
+            entries = [(node, selector) for node, selector in matched if id(node) not in ancestor_ids]
+            if len(entries) > 30:  # Limitar para evitar demasiados elementos
+                break
+        
+        # Si no se encontraron entradas específicas, buscar en contenedor principal
+        if not entries:
+            if not use_fallback:
+                timer.lap('select')
+                return scraped_data, None
+            
+            main_containers = soup.select(self.MAIN_CONTAINERS)
+            timer.lap('select')
+            for container in main_containers:
+                links = container.find_all('a', href=True)
+                for link in links[:20]:  # Limitar a 20 enlaces
+                    title = self.extract_text_content(link, text_cache)
+                    if self.is_meaningful_title(title):
+                        full_url = urljoin(url, link['href']).strip()
+                        if self.is_valid_url(full_url):
+                            # Limpiar URL de parámetros innecesarios
+                            full_url = full_url.split('#')[0]
+                            scraped_data.append({
+                                "title": title,
+                                "link": full_url
+                            })
+            
+            # Los enlaces del contenedor no dicen nada de los selectores del
+            # dominio: no se aprende perfil (uno vacío anularía la búsqueda)
+            timer.lap('extract')
+            return scraped_data, None
+        
+        timer.lap('select')
+        
+        # Selectores con algún nodo, aunque no diera elemento: puede haber
+        # descartado a un envoltorio que sin él se tomaría como entrada
+        matched_selectors = {selector for _, selector in matched}
+        
+        # Procesar entradas encontradas
+        for entry, _ in entries:
+            title = self.get_best_title(entry, text_cache)
+            
+            if title and self.is_meaningful_title(title):
+                # Buscar enlace en la entrada
+                link_element = entry.find('a', href=True)
+                
+                if link_element:
+                    link = urljoin(url, link_element['href']).strip()
+                    link = link.split('#')[0]  # Eliminar anclas
                     
-                    if title:
-                        # Buscar enlace en la entrada
-                        link_element = entry.find('a', href=True)
-                        
-                        if link_element:
-                            link = urljoin(url, link_element['href']).strip()
-                            link = link.split('#')[0]  # Eliminar anclas
-                            
-                            if self.is_valid_url(link):
-                                scraped_data.append({
-                                    "title": title,
-                                    "link": link
-                                })
-            
-            # Eliminar duplicados y filtrar
-            unique_data = []
-            seen = set()
+                    if self.is_valid_url(link):
+                        scraped_data.append({
+                            "title": title,
+                            "link": link
+                        })
+        
+        timer.lap('extract')
+        
+        learned = {"selectors": [selector for selector in selectors if selector in matched_selectors]}
+        return scraped_data, learned
+    
+    def dedupe_items(self, scraped_data):
+        """Elimina duplicados y títulos con CSS, y ordena por longitud del título"""
+        unique_data = []
+        seen = set()
+        
+        for item in scraped_data:
+            # Verificar que el título no contenga CSS
+            if self.contains_css_like_content(item['title']):
+                continue
+            
+            # Crear clave única
+            key = (item['title'].lower().strip(), item['link'])
             
-            for item in scraped_data:
-                # Crear clave única basada en título y dominio del enlace
-                domain = urlparse(item['link']).netloc
-                key = (item['title'].lower().strip(), domain)
+            if key not in seen and len(item['title']) > 5:
+                unique_data.append(item)
+                seen.add(key)
+        
+        # Ordenar por longitud de título (títulos más descriptivos primero)
+        unique_data.sort(key=lambda x: len(x['title']), reverse=True)
+        
+        return unique_data
+    
+    def fetch(self, url, headers, deadline):
+        """GET en streaming cuya conexión, espera de cabeceras y reintentos terminan antes de `deadline`
+        
+        Cada intento usa como timeout el tiempo que queda (como mucho 15 s)
+        y DeadlineRetry deja de reintentar al pasar el límite. El cuerpo se
+        lee después con read_body, con el mismo límite.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout()
+        token = _fetch_deadline.set(deadline)
+        try:
+            return self.session.get(url, headers=headers, timeout=min(15, remaining), stream=True)
+        except requests.exceptions.ConnectionError as e:
+            # Reintentos cortados por el límite: es un timeout, no un fallo de conexión
+            if not isinstance(e, requests.exceptions.Timeout) and time.monotonic() >= deadline:
+                raise requests.exceptions.Timeout(str(e)) from e
+            raise
+        finally:
+            _fetch_deadline.reset(token)
+    
+    def read_body(self, response, deadline, info):
+        """Lee el cuerpo de la respuesta por bloques hasta el límite de tamaño o de tiempo
+        
+        Si se alcanza un límite se deja de leer y se devuelve lo recibido;
+        `info['truncated']` indica el motivo ('size', 'deadline' o 'timeout').
+        """
+        chunks = []
+        received = 0
+        info['truncated'] = False
+        
+        # read1 devuelve lo que haya disponible sin esperar a llenar el bloque,
+        # así el límite de tiempo se comprueba aunque el origen envíe gota a gota
+        read1 = getattr(response.raw, 'read1', None)
+        if read1 is not None:
+            reader = iter(lambda: read1(FETCH_CHUNK_SIZE, decode_content=True), b'')
+        else:
+            reader = response.iter_content(FETCH_CHUNK_SIZE)
+        
+        try:
+            for chunk in reader:
+                chunks.append(chunk)
+                received += len(chunk)
                 
-                if key not in seen and len(item['title']) > 5:
-                    unique_data.append(item)
-                    seen.add(key)
+                if received >= self.max_bytes:
+                    info['truncated'] = 'size'
+                    break
+                if time.monotonic() >= deadline:
+                    info['truncated'] = 'deadline'
+                    break
+        except (ReadTimeoutError, requests.exceptions.ConnectionError):
+            # Si ya se recibió algo, se procesa lo que haya llegado
+            if not chunks:
+                raise requests.exceptions.Timeout()
+            info['truncated'] = 'timeout'
+        finally:
+            response.close()
+        
+        body = b''.join(chunks)
+        if info['truncated']:
+            body = trim_partial_utf8(body[:self.max_bytes])
+        info['bytes_received'] = len(body)
+        return body
+    
+    def scrape_website(self, url, info=None, use_cache=True, parser=None, collect_links=False, max_age=None):
+        """Método principal de scraping
+        
+        Si se pasa el diccionario `info`, se rellena con metadatos de la
+        petición, como el estado de la caché ('hit', 'revalidated',
+        'unchanged' si el cuerpo no cambió, 'miss' o 'bypass'), el parser utilizado, la duración de cada etapa en
+        `info['timings']` y si el resultado se compartió con otra petición
+        simultánea a la misma URL (`info['coalesced']`). Con `collect_links`
+        se añaden además todos los enlaces de la página en `info['links']`.
+        `max_age` acorta la vigencia de la caché para esta llamada: con 0 se
+        revalida siempre con el origen, pero se siguen aprovechando el 304 y
+        el resumen del cuerpo.
+        """
+        if info is None:
+            info = {}
+        
+        parser = resolve_parser(parser) if parser else self.parser
+        
+        def run():
+            leader_info = {}
+            data = self._scrape_website(url, leader_info, use_cache, parser, collect_links, max_age)
+            return data, leader_info
+        
+        # Las peticiones simultáneas a la misma URL esperan al primer scraping
+        key = (normalize_url(url), parser, use_cache, collect_links, max_age)
+        (data, leader_info), shared = self.flights.do(key, run)
+        
+        info.update(leader_info)
+        info['coalesced'] = shared
+        if shared:
+            self.metrics.inc('scraper_coalesced_total')
+            data = [dict(item) for item in data]
+        
+        return data
+    
+    def _scrape_website(self, url, info, use_cache, parser, collect_links=False, max_age=None):
+        """Descarga la página (o usa la caché) y extrae sus elementos"""
+        info['parser'] = parser
+        timings = info['timings'] = {}
+        start_time = time.perf_counter()
+        
+        try:
+            # El resultado depende del parser, así que forma parte de la clave
+            cache_key = (normalize_url(url), parser)
+            entry = self.cache.get(cache_key) if use_cache else None
+            
+            # Una entrada guardada sin enlaces no sirve para el modo rastreo
+            if collect_links and entry is not None and entry.links is None:
+                entry = None
+            
+            # Resultado reciente en caché: no hace falta ir al origen
+            ttl = self.cache.ttl if max_age is None else min(self.cache.ttl, max_age)
+            if entry is not None and entry.is_fresh(ttl):
+                info['cache'] = 'hit'
+                info['source'] = entry.source
+                self.metrics.inc('scraper_cache_results_total', result='hit')
+                if collect_links:
+                    info['links'] = entry.get_links()
+                return entry.get_items()
+            
+            # Resultado caducado: revalidar con ETag / Last-Modified
+            headers = self.headers
+            if entry is not None:
+                headers = dict(self.headers)
+                headers.update(entry.conditional_headers())
+            
+            # Realizar petición en modo streaming, con un límite de tiempo total
+            fetch_start = time.perf_counter()
+            deadline = time.monotonic() + self.fetch_deadline
+            response = self.fetch(url, headers, deadline)
+            self.metrics.inc('scraper_upstream_responses_total', status=str(response.status_code))
+            
+            if response.status_code == 304 and entry is not None:
+                response.close()
+                timings['fetch'] = time.perf_counter() - fetch_start
+                self.cache.refresh(cache_key, response.headers)
+                info['cache'] = 'revalidated'
+                info['source'] = entry.source
+                self.metrics.inc('scraper_cache_results_total', result='revalidated')
+                if collect_links:
+                    info['links'] = entry.get_links()
+                return entry.get_items()
             
-            # Ordenar por longitud de título (títulos más descriptivos primero)
-            unique_data.sort(key=lambda x: len(x['title']), reverse=True)
+            if response.status_code >= 400:
+                response.close()
+            response.raise_for_status()
+            
+            content = self.read_body(response, deadline, info)
+            timings['fetch'] = time.perf_counter() - fetch_start
+            self.metrics.inc('scraper_downloaded_bytes_total', len(content))
+            if self.store is not None:
+                self.store.put(url, response.status_code, response.headers, content, info['truncated'])
+            
+            # Mismo cuerpo que el de la entrada caducada: no hace falta extraer
+            content_hash = hashlib.blake2b(content, digest_size=16).digest()
+            if (entry is not None and entry.content_hash == content_hash
+                    and (entry.links is not None or not collect_links)):
+                self.cache.refresh(cache_key, response.headers)
+                info['cache'] = 'unchanged'
+                info['source'] = entry.source
+                self.metrics.inc('scraper_cache_results_total', result='unchanged')
+                if collect_links:
+                    info['links'] = entry.get_links()
+                return entry.get_items()
+            if info['truncated']:
+                self.metrics.inc('scraper_truncated_total', reason=info['truncated'])
+            
+            # Un feed o JSON-LD con el listado evita la extracción heurística
+            links = [] if collect_links else None
+            data, info['source'] = None, 'html'
+            if self.structured:
+                data, info['source'] = self.extract_structured(content, url, deadline, timings)
+            if data is None or collect_links:
+                charset_start = time.perf_counter()
+                encoding = self.resolve_encoding(content, url, response.headers.get('Content-Type'), info)
+                timings['charset'] = time.perf_counter() - charset_start
+            if data is None:
+                data = self.extract_items(content, url, parser, timings, links, encoding, info)
+            elif collect_links:
+                links.extend(self.collect_links(self.parse_html(self.decode_content(content, encoding), parser), url))
+            if collect_links:
+                info['links'] = links
             
-            # Limitar resultados para evitar respuestas demasiado grandes
-            return unique_data[:50]
+            # Un cuerpo cortado por tiempo depende de la red: no se cachea
+            if use_cache and info['truncated'] in (False, 'size'):
+                self.cache.store(cache_key, data, response.headers, links, info['source'], content_hash)
+            info['cache'] = 'miss' if use_cache else 'bypass'
+            self.metrics.inc('scraper_cache_results_total', result=info['cache'])
+            
+            return data
             
         except requests.exceptions.Timeout:
+            self.metrics.inc('scraper_errors_total', kind='timeout')
             raise Exception("Timeout: La página tardó demasiado en responder")
         except requests.exceptions.ConnectionError:
+            self.metrics.inc('scraper_errors_total', kind='connection')
             raise Exception("Error de conexión: No se pudo conectar con la página")
         except requests.exceptions.HTTPError as e:
+            self.metrics.inc('scraper_errors_total', kind='http')
             raise Exception(f"Error HTTP: {e.response.status_code}")
         except Exception as e:
+            self.metrics.inc('scraper_errors_total', kind='other')
             raise Exception(f"Error inesperado: {str(e)}")
+        finally:
+            for stage, seconds in timings.items():
+                self.metrics.observe('scraper_stage_duration_seconds', seconds, stage=stage)
+            self.metrics.observe('scraper_scrape_duration_seconds', time.perf_counter() - start_time)
+    
+    def select_new_items(self, url, data, info, since=None, only_new=False):
+        """Registra los elementos devueltos para la URL y, si se pide, deja solo los nuevos
+        
+        Con `since` (un cursor de una respuesta anterior) se devuelven los
+        elementos que aparecieron después de ese cursor; con `only_new`, los
+        que no había visto ningún scraping anterior de la URL. En `info` se
+        anotan el cursor actual y cuántos elementos se omitieron.
+        """
+        generations, previous, current = self.history.observe(url, data)
+        info['cursor'] = self.history.cursor(current)
+        
+        if since is not None:
+            since_generation = self.history.parse_cursor(since)
+            if since_generation is None:
+                # Cursor de otro proceso o de antes de un reinicio: se devuelve todo
+                info['cursor_reset'] = True
+                return data
+        elif only_new:
+            since_generation = previous
+        else:
+            return data
+        
+        new_items = [item for item, generation in zip(data, generations) if generation > since_generation]
+        info['known_items'] = len(data) - len(new_items)
+        return new_items
+    
+    def host_semaphore(self, url):
+        """Devuelve el semáforo que limita la concurrencia hacia un host"""
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            return self._host_semaphores[host]
+    
+    def _scrape_one(self, url, use_cache=True, parser=None, debug=False, since=None, only_new=False):
+        """Scrapea una URL del lote respetando el límite por host"""
+        start_time = time.time()
+        info = {}
+        try:
+            with self.host_semaphore(url):
+                data = self.scrape_website(url, info, use_cache=use_cache, parser=parser)
+            data = self.select_new_items(url, data, info, since, only_new)
+            result = {
+                "url": url,
+                "success": True,
+                "data": data,
+                "total_items": len(data),
+                **scrape_metadata(info, debug),
+                "processing_time": round(time.time() - start_time, 2)
+            }
+            return result
+        except Exception as e:
+            return {
+                "url": url,
+                "success": False,
+                "error": "Error al procesar la página",
+                "details": str(e),
+                "processing_time": round(time.time() - start_time, 2)
+            }
+    
+    def scrape_batch(self, urls, use_cache=True, parser=None, debug=False, since=None, only_new=False):
+        """Scrapea varias URLs en paralelo y devuelve los resultados en el mismo orden"""
+        results = [None] * len(urls)
+        for index, result in self.iter_batch(urls, use_cache, parser, debug, since, only_new):
+            results[index] = result
+        return results
+    
+    def iter_batch(self, urls, use_cache=True, parser=None, debug=False, since=None, only_new=False):
+        """Scrapea varias URLs en paralelo y genera (índice, resultado) según terminan
+        
+        `since` es un diccionario URL -> cursor para el modo solo-nuevos. Si
+        se deja de consumir el generador (p. ej. el cliente cierra la
+        conexión), las URLs que aún no han empezado se cancelan.
+        """
+        since = since or {}
+        # Intercalar las URLs por host para que los hilos no se bloqueen
+        # todos esperando al mismo servidor
+        by_host = defaultdict(list)
+        for index, url in enumerate(urls):
+            by_host[urlparse(url).netloc.lower()].append(index)
+        
+        order = []
+        queues = list(by_host.values())
+        while queues:
+            for queue in queues:
+                order.append(queue.pop(0))
+            queues = [queue for queue in queues if queue]
+        
+        futures = {
+            self._executor.submit(self._scrape_one, urls[index], use_cache, parser, debug,
+                                  since.get(urls[index]), only_new): index
+            for index in order
+        }
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def robots_rules(self, url):
+        """Reglas de robots.txt del origen de una URL, cacheadas por origen
+        
+        Como indica el RFC 9309, un 4xx equivale a no tener robots.txt y un
+        5xx o un error de red a prohibirlo todo; en ese caso se vuelve a
+        pedir tras ROBOTS_ERROR_TTL segundos.
+        """
+        parts = urlsplit(normalize_url(url))
+        origin = f'{parts.scheme}://{parts.netloc}'
+        rules = self.robots.get(origin)
+        if rules is not None:
+            return rules
+        
+        def fetch():
+            rules = RobotFileParser(origin + '/robots.txt')
+            ttl = None
+            try:
+                response = self.session.get(rules.url, headers=self.headers, timeout=10, stream=True)
+                with response:
+                    if response.status_code >= 500:
+                        rules.disallow_all = True
+                        ttl = ROBOTS_ERROR_TTL
+                    elif response.status_code >= 400:
+                        rules.allow_all = True
+                    else:
+                        body = response.raw.read(ROBOTS_MAX_BYTES, decode_content=True)
+                        rules.parse(body.decode('utf-8', errors='replace').splitlines())
+            except (requests.exceptions.RequestException, ReadTimeoutError):
+                rules.disallow_all = True
+                ttl = ROBOTS_ERROR_TTL
+            self.robots.store(origin, rules, ttl)
+            return rules
+        
+        # Varias páginas del mismo origen comparten una sola descarga
+        rules, _ = self.flights.do(('robots', origin), fetch)
+        return rules
+    
+    def _crawl_page(self, url, use_cache, parser, debug):
+        """Scrapea una página del rastreo si robots.txt lo permite
+        
+        Devuelve el resultado (con el formato de los lotes), los enlaces de
+        la página y la espera en segundos antes de volver a pedir al host.
+        """
+        user_agent = self.headers['User-Agent']
+        rules = self.robots_rules(url)
+        delay = max(self.crawl_delay, float(rules.crawl_delay(user_agent) or 0))
+        if not rules.can_fetch(user_agent, url):
+            return {"url": url, "success": False, "skipped": "robots"}, [], 0.0
+        
+        start_time = time.time()
+        info = {}
+        try:
+            with self.host_semaphore(url):
+                data = self.scrape_website(url, info, use_cache=use_cache, parser=parser, collect_links=True)
+        except Exception as e:
+            return {
+                "url": url,
+                "success": False,
+                "error": "Error al procesar la página",
+                "details": str(e),
+                "processing_time": round(time.time() - start_time, 2)
+            }, [], delay
+        
+        result = {
+            "url": url,
+            "success": True,
+            "data": data,
+            "total_items": len(data),
+            **scrape_metadata(info, debug),
+            "processing_time": round(time.time() - start_time, 2)
+        }
+        return result, info.get('links') or [], delay
+    
+    def iter_crawl(self, seed, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH, scope='host',
+                   use_cache=True, parser=None, debug=False):
+        """Rastrea un sitio a partir de `seed` y genera el resultado de cada página según termina
+        
+        Recorre en anchura los enlaces de cada página hasta `max_depth`
+        saltos desde la semilla, sin pasar de `max_pages` páginas
+        descargadas ni de `self.crawl_deadline` segundos. Las páginas
+        prohibidas por robots.txt se generan con `skipped` y no cuentan
+        para el límite. Cada resultado lleva su profundidad y la página
+        desde la que se descubrió (`parent`).
+        """
+        deadline = time.monotonic() + self.crawl_deadline
+        frontier = CrawlFrontier()
+        frontier.add(seed, 0)
+        in_flight = {}
+        fetched = 0
+        
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                
+                # Lanzar una página de cada host libre, hasta llenar el pool
+                while fetched + len(in_flight) < max_pages and len(in_flight) < self.max_workers:
+                    popped = frontier.pop(now)
+                    if popped is None:
+                        break
+                    host, (url, depth, parent) = popped
+                    future = self._executor.submit(self._crawl_page, url, use_cache, parser, debug)
+                    in_flight[future] = (host, depth, parent)
+                
+                # Con el pool lleno o el límite alcanzado solo se espera a las páginas en curso
+                can_launch = fetched + len(in_flight) < max_pages and len(in_flight) < self.max_workers
+                pending_wait = frontier.wait_time(now) if can_launch else None
+                if not in_flight:
+                    if pending_wait is None or now + pending_wait >= deadline:
+                        break
+                    time.sleep(pending_wait)
+                    continue
+                
+                # Esperar a que termine una página o a que otro host quede libre
+                timeout = min(pending_wait, deadline - now) if pending_wait is not None else deadline - now
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, depth, parent = in_flight.pop(future)
+                    result, links, delay = future.result()
+                    frontier.release(host, delay)
+                    if not result.get('skipped'):
+                        fetched += 1
+                    
+                    if depth < max_depth:
+                        for link in links:
+                            if in_crawl_scope(link, seed, scope):
+                                frontier.add(link, depth + 1, result['url'])
+                    
+                    yield {**result, "depth": depth, "parent": parent}
+        finally:
+            for future in in_flight:
+                future.cancel()
+    
+    def crawl(self, seed, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH, scope='host',
+              use_cache=True, parser=None, debug=False):
+        """Rastrea un sitio y agrega los elementos de todas sus páginas
+        
+        Los elementos se deduplican con el mismo criterio que en una página
+        (título y enlace) y cada uno indica la página en la que apareció
+        primero (`source`) y su profundidad. `pages` resume cada página
+        visitada, en el orden en que terminó.
+        """
+        items = []
+        seen = set()
+        pages = []
+        
+        for page in self.iter_crawl(seed, max_pages, max_depth, scope, use_cache, parser, debug):
+            items.extend(new_crawl_items(page, seen))
+            pages.append(page)
+        
+        return {"items": items, "pages": pages}
+
+# Scraper propio de cada proceso del pool de extracción
+_worker_scraper = None
+
+def init_extract_worker():
+    """Inicializa un proceso del pool de extracción"""
+    global _worker_scraper
+    _worker_scraper = WebScraper(max_workers=1, profiles=DomainProfiles(path=None), extract_processes=0, store=False)
+
+def extract_in_worker(content, url, parser, profile, collect_links=False, encoding=None):
+    """Parsea y extrae una página dentro de un proceso del pool"""
+    timings = {}
+    stats = {}
+    links = [] if collect_links else None
+    items, learned, profile_hit = _worker_scraper.run_extraction(content, url, parser, timings, profile, links,
+                                                                 encoding, stats)
+    return items, learned, profile_hit, timings, links, stats
+
+def xml_local_name(tag):
+    """Nombre de una etiqueta XML sin espacio de nombres"""
+    if not isinstance(tag, str):
+        return ''
+    return tag.rsplit('}', 1)[-1].rsplit(':', 1)[-1]
+
+def jsonld_entries(node):
+    """Genera pares (título, enlace) de los nodos JSON-LD de listados y artículos"""
+    if isinstance(node, list):
+        for child in node:
+            yield from jsonld_entries(child)
+        return
+    if not isinstance(node, dict):
+        return
+    
+    types = node.get('@type')
+    types = set(types) if isinstance(types, list) else {types}
+    
+    if 'ItemList' in types:
+        for element in node.get('itemListElement') or []:
+            if not isinstance(element, dict):
+                continue
+            # ListItem con el artículo en `item` (objeto o URL) o con `url` directamente
+            item = element.get('item')
+            if isinstance(item, dict):
+                yield (item.get('headline') or item.get('name') or element.get('name'),
+                       item.get('url') or item.get('@id') or element.get('url'))
+            else:
+                yield element.get('name') or element.get('headline'), item or element.get('url')
+    elif types & JSONLD_ARTICLE_TYPES:
+        page = node.get('mainEntityOfPage')
+        if isinstance(page, dict):
+            page = page.get('@id')
+        yield node.get('headline') or node.get('name'), node.get('url') or page
+    
+    for key in ('@graph', 'mainEntity'):
+        if key in node:
+            yield from jsonld_entries(node[key])
+
+def new_crawl_items(page, seen):
+    """Saca los elementos de una página del rastreo que no se habían visto
+    
+    Se les añade la página de origen y su profundidad; `seen` guarda las
+    claves (título y enlace) ya devueltas en el rastreo.
+    """
+    items = []
+    for item in page.pop('data', []):
+        key = (item['title'].lower().strip(), item['link'])
+        if key not in seen:
+            seen.add(key)
+            items.append({**item, "source": page['url'], "depth": page['depth']})
+    return items
+
+def format_timings(timings):
+    """Convierte las duraciones por etapa a milisegundos redondeados"""
+    return {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+
+def scrape_metadata(info, debug=False):
+    """Campos de la respuesta que describen cómo se obtuvo el resultado"""
+    metadata = {
+        "cache": info.get('cache'),
+        "parser": info.get('parser'),
+        "truncated": info.get('truncated', False),
+        "coalesced": info.get('coalesced', False),
+        "bytes_received": info.get('bytes_received', 0),
+        "source": info.get('source'),
+        "cursor": info.get('cursor'),
+    }
+    if 'encoding_source' in info:
+        metadata["encoding"] = info['encoding']
+        metadata["encoding_source"] = info['encoding_source']
+    if info.get('parse_limited'):
+        metadata["parse_limited"] = info['parse_limited']
+    if 'known_items' in info:
+        metadata["known_items"] = info['known_items']
+    if info.get('cursor_reset'):
+        metadata["cursor_reset"] = True
+    if debug:
+        metadata["timings_ms"] = format_timings(info.get('timings', {}))
+        if 'memory' in info:
+            metadata["memory_kb"] = {stage: round(size / 1024, 1) for stage, size in info['memory'].items()}
+    return metadata
+
+def items_etag(data, cursor=None):
+    """ETag (sin comillas) de una respuesta de /scrape
+    
+    Solo depende de los elementos devueltos y del cursor, no de los tiempos
+    ni del estado de la caché, así que se envía como ETag débil.
+    """
+    key = json.dumps([data, cursor], ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+def compress_body(body, accept_encoding):
+    """Comprime un cuerpo con la mejor codificación que acepte el cliente
+    
+    Devuelve (cuerpo, codificación), o el cuerpo original y None si es
+    pequeño o el cliente no acepta ninguna de COMPRESS_ENCODINGS.
+    """
+    if len(body) < COMPRESS_MIN_BYTES or not accept_encoding:
+        return body, None
+    encoding = parse_accept_header(accept_encoding).best_match(COMPRESS_ENCODINGS)
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY), 'br'
+    if encoding == 'gzip':
+        return gzip.compress(body, COMPRESS_GZIP_LEVEL, mtime=0), 'gzip'
+    return body, None
+
+def stream_format(requested, accept=''):
+    """Formato de streaming pedido por el cliente, o None para JSON normal
+    
+    Se elige con el parámetro `stream` (ndjson o sse) o, si no se indica,
+    con la cabecera Accept. Lanza ValueError si el formato no existe.
+    """
+    if requested:
+        if requested not in STREAM_FORMATS:
+            raise ValueError(f"Formato de streaming no soportado. Opciones: {', '.join(STREAM_FORMATS)}")
+        return requested
+    for name, mimetype in STREAM_FORMATS.items():
+        if mimetype in (accept or ''):
+            return name
+    return None
+
+def format_event(fmt, event, payload):
+    """Serializa un evento como línea NDJSON o como evento SSE"""
+    if fmt == 'sse':
+        return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": event, **payload}, ensure_ascii=False) + "\n"
+
+def stream_headers():
+    """Cabeceras para que proxies y navegadores no acumulen la respuesta"""
+    return {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def scrape_events(fmt, url, data, info, debug, start_time):
+    """Eventos de una página: un `item` por elemento y un `end` con el resumen"""
+    for index, item in enumerate(data):
+        yield format_event(fmt, 'item', {"index": index, **item})
+    yield format_event(fmt, 'end', {
+        "success": True,
+        "total_items": len(data),
+        **scrape_metadata(info, debug),
+        "processing_time": round(time.time() - start_time, 2),
+        "url": url
+    })
 
-# Instancia global del scraper
+def scrape_error_event(fmt, url, error):
+    return format_event(fmt, 'error', {
+        "success": False,
+        "error": "Error al procesar la página",
+        "details": str(error),
+        "url": url
+    })
+
+# Instancia global del scraper y de la monitorización, que es propia de cada
+# proceso: con varios workers cada uno tiene sus URLs registradas
 scraper = WebScraper()
+monitor = Monitor(scraper)
+admission = AdmissionControl(metrics=scraper.metrics)
+
+@app.before_request
+def start_service():
+    """Carga el estado persistente del servicio: almacén de páginas, perfiles y URLs monitorizadas
+    
+    Solo lo hace el proceso que sirve la API, no los que importan este módulo
+    (procesos de extracción, replay): se llama al arrancar con __main__ o
+    ASGI y, con otros servidores WSGI (p. ej. gunicorn), en la primera
+    petición. Las siguientes llamadas no hacen nada.
+    """
+    scraper.start()
+    monitor.start()
 
 @app.route('/scrape', methods=['GET'])
 def scrape_website():
@@ -554,19 +3056,77 @@ def scrape_website():
     if not scraper.is_valid_url(url_to_scrape):
         return jsonify({"error": "La URL proporcionada no es válida."}), 400
     
+    # Permite elegir el parser de HTML para esta petición
+    parser = request.args.get('parser')
+    if parser and parser not in PARSER_BACKENDS:
+        return jsonify({"error": f"Parser no soportado. Opciones: {', '.join(PARSER_BACKENDS)}"}), 400
+    
+    # Permite saltarse la caché con ?cache=0
+    use_cache = request.args.get('cache', '1') != '0'
+    
+    # Con ?debug=1 se devuelve la duración de cada etapa
+    debug = request.args.get('debug', '0') == '1'
+    
+    # Con ?since=<cursor> u ?only_new=1 solo se devuelven los elementos nuevos
+    since = request.args.get('since')
+    only_new = request.args.get('only_new', '0') == '1'
+    
+    # Con ?stream=ndjson|sse (o la cabecera Accept) se envía cada elemento
+    # como una línea o evento independiente
+    try:
+        fmt = stream_format(request.args.get('stream'), request.headers.get('Accept'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Control de admisión: con el servicio saturado se responde 429 enseguida
+    host = urlparse(url_to_scrape).netloc.lower()
+    started = admission.acquire(host)
+    
+    if fmt:
+        def generate():
+            # El evento inicial sale antes de descargar la página
+            yield format_event(fmt, 'start', {"url": url_to_scrape})
+            start_time = time.time()
+            info = {}
+            try:
+                data = scraper.scrape_website(url_to_scrape, info, use_cache=use_cache, parser=parser)
+                data = scraper.select_new_items(url_to_scrape, data, info, since, only_new)
+            except Exception as e:
+                yield scrape_error_event(fmt, url_to_scrape, e)
+                return
+            yield from scrape_events(fmt, url_to_scrape, data, info, debug, start_time)
+        
+        # El hueco se libera cuando termina (o se corta) la respuesta
+        response = Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[fmt], headers=stream_headers())
+        response.call_on_close(lambda: admission.release(host, started))
+        return response
+    
     try:
         # Realizar scraping
         start_time = time.time()
-        data = scraper.scrape_website(url_to_scrape)
+        info = {}
+        data = scraper.scrape_website(url_to_scrape, info, use_cache=use_cache, parser=parser)
+        data = scraper.select_new_items(url_to_scrape, data, info, since, only_new)
         end_time = time.time()
         
-        return jsonify({
+        result = {
             "success": True,
             "data": data,
             "total_items": len(data),
+            **scrape_metadata(info, debug),
             "processing_time": round(end_time - start_time, 2),
             "url": url_to_scrape
-        })
+        }
+        
+        # Si el cliente ya tiene estos elementos (If-None-Match) se responde 304
+        response = jsonify(result)
+        response.set_etag(items_etag(data, info.get('cursor')), weak=True)
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            # compress_response no toca los 304, pero las cachés deben saber que el 200 varía
+            response.vary.add('Accept-Encoding')
+            scraper.metrics.inc('scraper_not_modified_total')
+        return response
         
     except Exception as e:
         return jsonify({
@@ -575,11 +3135,291 @@ def scrape_website():
             "details": str(e),
             "url": url_to_scrape
         }), 500
+    finally:
+        admission.release(host, started)
+
+@app.route('/scrape/batch', methods=['POST'])
+def scrape_batch():
+    """Endpoint para scrapear varias URLs en una sola petición"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        payload = {}
+    urls = payload.get('urls')
+    
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "El campo 'urls' debe ser una lista no vacía."}), 400
+    
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({"error": f"Se admiten como máximo {BATCH_MAX_URLS} URLs por lote."}), 400
+    
+    invalid = [url for url in urls if not isinstance(url, str) or not scraper.is_valid_url(url)]
+    if invalid:
+        return jsonify({"error": "Hay URLs no válidas en el lote.", "invalid_urls": invalid}), 400
+    
+    parser = payload.get('parser')
+    if parser and parser not in PARSER_BACKENDS:
+        return jsonify({"error": f"Parser no soportado. Opciones: {', '.join(PARSER_BACKENDS)}"}), 400
+    
+    use_cache = payload.get('cache', True) is not False
+    debug = payload.get('debug') is True
+    
+    # Modo solo-nuevos: "since" asocia a cada URL el cursor de su última respuesta
+    since = payload.get('since')
+    if since is not None and not isinstance(since, dict):
+        return jsonify({"error": "El campo 'since' debe ser un objeto URL -> cursor."}), 400
+    only_new = payload.get('only_new') is True
+    
+    try:
+        fmt = stream_format(payload.get('stream'), request.headers.get('Accept'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Un lote ocupa un hueco del límite global; el reparto por host lo hace iter_batch
+    started = admission.acquire()
+    
+    if fmt:
+        # Cada resultado se envía en cuanto termina su URL, con su posición
+        # en el lote; el servidor no acumula los resultados
+        def generate():
+            start_time = time.time()
+            failed = 0
+            yield format_event(fmt, 'start', {"total_urls": len(urls)})
+            for index, result in scraper.iter_batch(urls, use_cache=use_cache, parser=parser, debug=debug,
+                                                    since=since, only_new=only_new):
+                failed += not result["success"]
+                yield format_event(fmt, 'result', {"index": index, **result})
+            yield format_event(fmt, 'end', {
+                "success": True,
+                "total_urls": len(urls),
+                "failed_urls": failed,
+                "processing_time": round(time.time() - start_time, 2)
+            })
+        
+        response = Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[fmt], headers=stream_headers())
+        response.call_on_close(lambda: admission.release(None, started))
+        return response
+    
+    start_time = time.time()
+    try:
+        results = scraper.scrape_batch(urls, use_cache=use_cache, parser=parser, debug=debug,
+                                       since=since, only_new=only_new)
+    finally:
+        admission.release(None, started)
+    end_time = time.time()
+    
+    return jsonify({
+        "success": True,
+        "results": results,
+        "total_urls": len(urls),
+        "failed_urls": sum(1 for result in results if not result["success"]),
+        "processing_time": round(end_time - start_time, 2)
+    })
+
+@app.route('/crawl', methods=['GET'])
+def crawl_site():
+    """Endpoint para rastrear un sitio a partir de una URL semilla"""
+    seed = request.args.get('url')
+    
+    if not seed:
+        return jsonify({"error": "El parámetro 'url' es obligatorio."}), 400
+    
+    if not scraper.is_valid_url(seed):
+        return jsonify({"error": "La URL proporcionada no es válida."}), 400
+    
+    try:
+        max_pages = int(request.args.get('max_pages', CRAWL_MAX_PAGES))
+        max_depth = int(request.args.get('max_depth', CRAWL_MAX_DEPTH))
+    except ValueError:
+        return jsonify({"error": "Los parámetros 'max_pages' y 'max_depth' deben ser enteros."}), 400
+    
+    if not 1 <= max_pages <= CRAWL_MAX_PAGES or not 0 <= max_depth <= CRAWL_MAX_DEPTH:
+        return jsonify({"error": f"Se admiten como máximo {CRAWL_MAX_PAGES} páginas "
+                                 f"y {CRAWL_MAX_DEPTH} niveles de profundidad."}), 400
+    
+    # Regla de dominio: mismo host, mismo dominio (con subdominios) o cualquiera
+    scope = request.args.get('scope', 'host')
+    if scope not in CRAWL_SCOPES:
+        return jsonify({"error": f"Ámbito no soportado. Opciones: {', '.join(CRAWL_SCOPES)}"}), 400
+    
+    parser = request.args.get('parser')
+    if parser and parser not in PARSER_BACKENDS:
+        return jsonify({"error": f"Parser no soportado. Opciones: {', '.join(PARSER_BACKENDS)}"}), 400
+    
+    use_cache = request.args.get('cache', '1') != '0'
+    debug = request.args.get('debug', '0') == '1'
+    
+    try:
+        fmt = stream_format(request.args.get('stream'), request.headers.get('Accept'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    crawl_args = (seed, max_pages, max_depth, scope, use_cache, parser, debug)
+    started = admission.acquire()
+    
+    if fmt:
+        # Un evento `page` por página terminada, con los elementos nuevos que aportó
+        def generate():
+            start_time = time.time()
+            seen = set()
+            pages = failed = 0
+            yield format_event(fmt, 'start', {"url": seed})
+            for page in scraper.iter_crawl(*crawl_args):
+                items = new_crawl_items(page, seen)
+                pages += 1
+                failed += not page['success'] and not page.get('skipped')
+                yield format_event(fmt, 'page', {**page, "items": items})
+            yield format_event(fmt, 'end', {
+                "success": True,
+                "total_items": len(seen),
+                "total_pages": pages,
+                "failed_pages": failed,
+                "processing_time": round(time.time() - start_time, 2),
+                "url": seed
+            })
+        
+        response = Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[fmt], headers=stream_headers())
+        response.call_on_close(lambda: admission.release(None, started))
+        return response
+    
+    start_time = time.time()
+    try:
+        result = scraper.crawl(*crawl_args)
+    finally:
+        admission.release(None, started)
+    end_time = time.time()
+    
+    return jsonify({
+        "success": True,
+        "data": result["items"],
+        "pages": result["pages"],
+        "total_items": len(result["items"]),
+        "total_pages": len(result["pages"]),
+        "failed_pages": sum(1 for page in result["pages"] if not page["success"] and not page.get("skipped")),
+        "processing_time": round(end_time - start_time, 2),
+        "url": seed
+    })
+
+@app.route('/monitor', methods=['POST'])
+def monitor_register():
+    """Registra una o varias URLs para volver a scrapearlas periódicamente"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        payload = {}
+    urls = payload.get('urls', [payload['url']] if 'url' in payload else None)
+    
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "Hay que indicar 'url' o una lista no vacía en 'urls'."}), 400
+    
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({"error": f"Se admiten como máximo {BATCH_MAX_URLS} URLs por petición."}), 400
+    
+    invalid = [url for url in urls if not isinstance(url, str) or not scraper.is_valid_url(url)]
+    if invalid:
+        return jsonify({"error": "Hay URLs no válidas.", "invalid_urls": invalid}), 400
+    
+    parser = payload.get('parser')
+    if parser and parser not in PARSER_BACKENDS:
+        return jsonify({"error": f"Parser no soportado. Opciones: {', '.join(PARSER_BACKENDS)}"}), 400
+    
+    try:
+        monitored = monitor.register(urls, parser, payload.get('interval'), payload.get('min_interval'),
+                                     payload.get('max_interval'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({"success": True, "monitored": monitored}), 201
+
+@app.route('/monitor', methods=['GET'])
+def monitor_list():
+    """Estado de todas las URLs monitorizadas"""
+    urls = monitor.status()
+    return jsonify({"success": True, "urls": urls, "total_urls": len(urls)})
+
+@app.route('/monitor', methods=['DELETE'])
+def monitor_unregister():
+    """Deja de monitorizar una URL"""
+    url = request.args.get('url')
+    if not url:
+        return jsonify({"error": "El parámetro 'url' es obligatorio."}), 400
+    if not monitor.unregister(url):
+        return jsonify({"error": "La URL no está monitorizada.", "url": url}), 404
+    return jsonify({"success": True, "url": url})
+
+@app.route('/monitor/result', methods=['GET'])
+def monitor_result():
+    """Último resultado de una URL monitorizada, servido desde memoria
+    
+    Con ?since=<cursor> solo se devuelven los elementos aparecidos después
+    de ese cursor. Si la URL aún no se ha comprobado se responde 202, y 502
+    si su primera comprobación falló.
+    """
+    url = request.args.get('url')
+    if not url:
+        return jsonify({"error": "El parámetro 'url' es obligatorio."}), 400
+    
+    result = monitor.result(url, request.args.get('since'))
+    if result is None:
+        return jsonify({"error": "La URL no está monitorizada.", "url": url}), 404
+    if result["success"]:
+        return jsonify(result)
+    return jsonify(result), 202 if result["pending"] else 502
+
+@app.route('/memory', methods=['GET'])
+def memory_profile():
+    """Picos de memoria de la extracción por etapa y por dominio (SCRAPER_MEMORY_PROFILE=1)"""
+    if not scraper.memory.enabled:
+        return jsonify({"error": "El perfilado de memoria no está activo (SCRAPER_MEMORY_PROFILE=1)."}), 404
+    try:
+        top = int(request.args.get('top', 20))
+    except ValueError:
+        return jsonify({"error": "El parámetro 'top' debe ser un entero."}), 400
+    return jsonify(scraper.memory.stats(top))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas del servicio en formato Prometheus"""
+    return Response(scraper.metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de salud del servicio"""
-    return jsonify({"status": "healthy", "service": "web-scraper"})
+    health = {"status": "healthy", "service": "web-scraper", "parser": scraper.parser,
+              "available_parsers": list(AVAILABLE_PARSERS)}
+    if scraper.store is not None:
+        health["store"] = scraper.store.stats()
+    health["monitor"] = monitor.stats()
+    # Para que el balanceador pueda evitar las instancias ocupadas
+    health["admission"] = admission.stats()
+    return jsonify(health)
+
+@app.after_request
+def compress_response(response):
+    """Comprime las respuestas JSON con brotli o gzip si el cliente lo acepta
+    
+    Las respuestas en streaming no se comprimen para no retener los eventos.
+    """
+    if (response.is_streamed or response.direct_passthrough or response.mimetype != 'application/json'
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body, encoding = compress_body(response.get_data(), request.headers.get('Accept-Encoding'))
+    if encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    scraper.metrics.inc('scraper_response_bytes_total', len(body), encoding=encoding or 'identity')
+    return response
+
+@app.errorhandler(Overloaded)
+def overloaded(error):
+    response = jsonify({
+        "success": False,
+        "error": "Servicio saturado, inténtelo más tarde",
+        "details": str(error),
+        "retry_after": error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
 
 @app.errorhandler(404)
 def not_found(error):
@@ -590,4 +3430,5 @@ def internal_error(error):
     return jsonify({"error": "Error interno del servidor"}), 500
 
 if __name__ == '__main__':
+    start_service()
     app.run(host='0.0.0.0', port=5000, debug=False)
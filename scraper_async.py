@@ -0,0 +1,660 @@
+"""Motor de scraping asíncrono y aplicación ASGI
+
+Mantiene el mismo contrato que /scrape y /scrape/batch de scraper_api, pero
+las descargas no bloquean: un único event loop mantiene en vuelo miles de
+orígenes lentos sobre un pool de conexiones compartido, y el parseo y la
+extracción (CPU) se ejecutan en un executor para no frenar el loop.
+
+Requiere aiohttp. Ejecutar con cualquier servidor ASGI, por ejemplo:
+
+    uvicorn scraper_async:app --host 0.0.0.0 --port 5000
+
+Las demás rutas (/health, /metrics...) se sirven con la aplicación Flask a
+través de asgiref si está instalado.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from werkzeug.http import parse_etags
+
+try:
+    import aiohttp
+except ImportError as e:
+    raise ImportError("scraper_async requiere aiohttp: pip install aiohttp (ver requirements.txt)") from e
+
+from scraper_api import (
+    BATCH_MAX_URLS, FETCH_CHUNK_SIZE, PARSER_BACKENDS, RETRY_BACKOFF_FACTOR, RETRY_STATUS_CODES,
+    RETRY_TOTAL, STREAM_FORMATS, STRUCTURED_MIN_ITEMS, Overloaded, admission, app as flask_app, compress_body,
+    format_event, items_etag, normalize_url, resolve_parser,
+    scrape_error_event, scrape_events, scrape_metadata, scraper, start_service, stream_format, stream_headers,
+    trim_partial_utf8,
+)
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+# Conexiones simultáneas del pool compartido (0 = sin límite)
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('SCRAPER_ASYNC_MAX_CONNECTIONS', '1000'))
+
+
+class AsyncWebScraper:
+    """Versión asíncrona de WebScraper.scrape_website
+
+    Comparte con el WebScraper que recibe la caché, las métricas, los
+    perfiles por dominio y toda la lógica de extracción; solo cambia cómo
+    se descarga la página.
+    """
+
+    def __init__(self, scraper, max_connections=ASYNC_MAX_CONNECTIONS, per_host_limit=None, extract_threads=None):
+        self.scraper = scraper
+        self.max_connections = max_connections
+        self.per_host_limit = scraper.per_host_limit if per_host_limit is None else per_host_limit
+        self._session = None
+        self._session_loop = None
+        self._flights = {}
+
+        # Hilos para la extracción; con pool de procesos solo esperan su resultado
+        if extract_threads is None:
+            extract_threads = max(os.cpu_count() or 1, scraper.extract_processes, 4)
+        self._executor = ThreadPoolExecutor(max_workers=extract_threads, thread_name_prefix='scraper-async')
+
+    async def get_session(self):
+        """Sesión HTTP compartida del event loop actual"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.per_host_limit,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.scraper.headers)
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def scrape_website(self, url, info=None, use_cache=True, parser=None):
+        """Método principal de scraping asíncrono (mismo contrato que WebScraper.scrape_website)"""
+        if info is None:
+            info = {}
+
+        parser = resolve_parser(parser) if parser else self.scraper.parser
+        key = (normalize_url(url), parser, use_cache)
+
+        # Las peticiones simultáneas a la misma URL esperan al primer scraping
+        flight = self._flights.get(key)
+        if flight is not None:
+            data, leader_info = await asyncio.shield(flight)
+            info.update(leader_info)
+            info['coalesced'] = True
+            self.scraper.metrics.inc('scraper_coalesced_total')
+            return [dict(item) for item in data]
+
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            leader_info = {}
+            data = await self._scrape_website(url, leader_info, use_cache, parser)
+            flight.set_result((data, leader_info))
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(Exception(str(e)))
+            # Marcar la excepción como recuperada aunque nadie más la espere
+            flight.exception()
+            raise
+        finally:
+            del self._flights[key]
+
+        info.update(leader_info)
+        info['coalesced'] = False
+        return data
+
+    async def _scrape_website(self, url, info, use_cache, parser):
+        """Descarga la página (o usa la caché) y extrae sus elementos"""
+        scraper = self.scraper
+        info['parser'] = parser
+        timings = info['timings'] = {}
+        start_time = time.perf_counter()
+
+        try:
+            cache_key = (normalize_url(url), parser)
+            entry = scraper.cache.get(cache_key) if use_cache else None
+
+            # Resultado reciente en caché: no hace falta ir al origen
+            if entry is not None and entry.is_fresh(scraper.cache.ttl):
+                info['cache'] = 'hit'
+                info['source'] = entry.source
+                scraper.metrics.inc('scraper_cache_results_total', result='hit')
+                return entry.get_items()
+
+            # Resultado caducado: revalidar con ETag / Last-Modified
+            headers = entry.conditional_headers() if entry is not None else {}
+
+            fetch_start = time.perf_counter()
+            status, response_headers, content = await self.fetch(url, headers, info)
+            timings['fetch'] = time.perf_counter() - fetch_start
+
+            if status == 304 and entry is not None:
+                scraper.cache.refresh(cache_key, response_headers)
+                info['cache'] = 'revalidated'
+                info['source'] = entry.source
+                scraper.metrics.inc('scraper_cache_results_total', result='revalidated')
+                return entry.get_items()
+
+            scraper.metrics.inc('scraper_downloaded_bytes_total', len(content))
+            if scraper.store is not None:
+                scraper.store.put(url, status, response_headers, content, info['truncated'])
+
+            # Mismo cuerpo que el de la entrada caducada: no hace falta extraer
+            content_hash = hashlib.blake2b(content, digest_size=16).digest()
+            if entry is not None and entry.content_hash == content_hash:
+                scraper.cache.refresh(cache_key, response_headers)
+                info['cache'] = 'unchanged'
+                info['source'] = entry.source
+                scraper.metrics.inc('scraper_cache_results_total', result='unchanged')
+                return entry.get_items()
+            if info['truncated']:
+                scraper.metrics.inc('scraper_truncated_total', reason=info['truncated'])
+
+            # Un feed o JSON-LD con el listado evita la extracción heurística
+            data, info['source'] = None, 'html'
+            if scraper.structured:
+                data, info['source'] = await self.extract_structured(content, url, timings)
+
+            # Codificación, parseo y extracción fuera del event loop: sin charset
+            # declarado, la detección completa puede tardar decenas de ms
+            if data is None:
+                loop = asyncio.get_running_loop()
+                data = await loop.run_in_executor(self._executor, self.extract_items, content, url, parser, timings,
+                                                  response_headers.get('Content-Type'), info)
+
+            # Un cuerpo cortado por tiempo depende de la red: no se cachea
+            if use_cache and info['truncated'] in (False, 'size'):
+                scraper.cache.store(cache_key, data, response_headers, source=info['source'], content_hash=content_hash)
+            info['cache'] = 'miss' if use_cache else 'bypass'
+            scraper.metrics.inc('scraper_cache_results_total', result=info['cache'])
+
+            return data
+
+        except asyncio.TimeoutError:
+            scraper.metrics.inc('scraper_errors_total', kind='timeout')
+            raise Exception("Timeout: La página tardó demasiado en responder")
+        except aiohttp.ClientResponseError as e:
+            scraper.metrics.inc('scraper_errors_total', kind='http')
+            raise Exception(f"Error HTTP: {e.status}")
+        except aiohttp.ClientConnectionError:
+            scraper.metrics.inc('scraper_errors_total', kind='connection')
+            raise Exception("Error de conexión: No se pudo conectar con la página")
+        except Exception as e:
+            scraper.metrics.inc('scraper_errors_total', kind='other')
+            raise Exception(f"Error inesperado: {str(e)}")
+        finally:
+            for stage, seconds in timings.items():
+                scraper.metrics.observe('scraper_stage_duration_seconds', seconds, stage=stage)
+            scraper.metrics.observe('scraper_scrape_duration_seconds', time.perf_counter() - start_time)
+
+    def extract_items(self, content, url, parser, timings, content_type, info):
+        """Resuelve la codificación y extrae los elementos (se ejecuta en self._executor)"""
+        charset_start = time.perf_counter()
+        encoding = self.scraper.resolve_encoding(content, url, content_type, info)
+        timings['charset'] = time.perf_counter() - charset_start
+        return self.scraper.extract_items(content, url, parser, timings, None, encoding, info)
+
+    async def extract_structured(self, content, url, timings):
+        """Versión asíncrona de WebScraper.extract_structured"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        items, source, feed_urls = await loop.run_in_executor(
+            self._executor, self.scraper.find_structured_items, content, url)
+        timings['structured'] = time.perf_counter() - start
+
+        if source == 'feed':
+            return items, source
+
+        if not items and feed_urls:
+            start = time.perf_counter()
+            try:
+                feed_info = {}
+                feed_status, feed_headers, feed = await self.fetch(feed_urls[0], {}, feed_info)
+                self.scraper.metrics.inc('scraper_downloaded_bytes_total', len(feed))
+                if self.scraper.store is not None:
+                    self.scraper.store.put(feed_urls[0], feed_status, feed_headers, feed, feed_info['truncated'])
+                items = await loop.run_in_executor(self._executor, self.scraper.parse_feed, feed, feed_urls[0])
+                source = 'feed'
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # Sin feed se sigue con el HTML que ya se tiene
+                items = []
+            timings['feed'] = time.perf_counter() - start
+
+        if len(items) >= STRUCTURED_MIN_ITEMS:
+            return items, source
+        return None, 'html'
+
+    async def fetch(self, url, headers, info):
+        """Descarga una URL con reintentos y límites de tamaño y tiempo
+
+        Devuelve (estado, cabeceras, cuerpo). Reintenta los errores de
+        conexión y los códigos de RETRY_STATUS_CODES igual que el Retry de
+        urllib3 del scraper síncrono.
+        """
+        session = await self.get_session()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.scraper.fetch_deadline
+
+        def backoff(attempt):
+            # Espera exponencial entre reintentos (sin espera en el primero)
+            return RETRY_BACKOFF_FACTOR * 2 ** (attempt - 1) if attempt > 1 else 0
+
+        for attempt in range(RETRY_TOTAL + 1):
+            if attempt > 1:
+                await asyncio.sleep(min(backoff(attempt), max(0.0, deadline - loop.time())))
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            # La conexión y la espera de las cabeceras tampoco pasan del límite
+            timeout = aiohttp.ClientTimeout(total=None, connect=min(15, remaining),
+                                            sock_read=min(15, remaining))
+
+            try:
+                response = await asyncio.wait_for(session.get(url, headers=headers, timeout=timeout), remaining)
+                async with response:
+                    self.scraper.metrics.inc('scraper_upstream_responses_total', status=str(response.status))
+
+                    # Sin tiempo para el siguiente intento, el error es la respuesta
+                    if (response.status in RETRY_STATUS_CODES and attempt < RETRY_TOTAL
+                            and loop.time() + backoff(attempt + 1) < deadline):
+                        continue
+                    if response.status == 304:
+                        info['truncated'] = False
+                        info['bytes_received'] = 0
+                        return response.status, response.headers, b''
+                    response.raise_for_status()
+
+                    body = await self.read_body(response, deadline, info)
+                    return response.status, response.headers, body
+            except aiohttp.ClientConnectionError:
+                if attempt >= RETRY_TOTAL or loop.time() >= deadline:
+                    raise
+
+    async def read_body(self, response, deadline, info):
+        """Lee el cuerpo por bloques hasta el límite de tamaño o de tiempo (como WebScraper.read_body)"""
+        loop = asyncio.get_running_loop()
+        max_bytes = self.scraper.max_bytes
+        chunks = []
+        received = 0
+        info['truncated'] = False
+
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    chunk = await asyncio.wait_for(response.content.read(FETCH_CHUNK_SIZE), remaining)
+                except asyncio.TimeoutError:
+                    if not chunks:
+                        raise
+                    info['truncated'] = 'deadline'
+                    break
+
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+
+                if received >= max_bytes:
+                    info['truncated'] = 'size'
+                    break
+        except (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError):
+            # Si ya se recibió algo, se procesa lo que haya llegado
+            if not chunks:
+                raise
+            info['truncated'] = 'timeout'
+
+        if info['truncated']:
+            # No se puede reutilizar una conexión con el cuerpo a medio leer
+            response.close()
+
+        body = b''.join(chunks)
+        if info['truncated']:
+            body = trim_partial_utf8(body[:max_bytes])
+        info['bytes_received'] = len(body)
+        return body
+
+    async def scrape_one(self, url, use_cache=True, parser=None, debug=False, since=None, only_new=False):
+        """Scrapea una URL del lote (mismo formato que WebScraper._scrape_one)"""
+        start_time = time.time()
+        info = {}
+        try:
+            data = await self.scrape_website(url, info, use_cache=use_cache, parser=parser)
+            data = self.scraper.select_new_items(url, data, info, since, only_new)
+            return {
+                "url": url,
+                "success": True,
+                "data": data,
+                "total_items": len(data),
+                **scrape_metadata(info, debug),
+                "processing_time": round(time.time() - start_time, 2)
+            }
+        except Exception as e:
+            return {
+                "url": url,
+                "success": False,
+                "error": "Error al procesar la página",
+                "details": str(e),
+                "processing_time": round(time.time() - start_time, 2)
+            }
+
+    async def scrape_batch(self, urls, use_cache=True, parser=None, debug=False, since=None, only_new=False):
+        """Scrapea varias URLs a la vez; el conector limita las conexiones por host"""
+        since = since or {}
+        return await asyncio.gather(*(
+            self.scrape_one(url, use_cache, parser, debug, since.get(url), only_new) for url in urls))
+
+    async def iter_batch(self, urls, use_cache=True, parser=None, debug=False, since=None, only_new=False):
+        """Genera (índice, resultado) de cada URL del lote según van terminando"""
+        since = since or {}
+
+        async def indexed(index, url):
+            return index, await self.scrape_one(url, use_cache, parser, debug, since.get(url), only_new)
+
+        tasks = [asyncio.ensure_future(indexed(index, url)) for index, url in enumerate(urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # El cliente se fue a mitad del lote: no seguir descargando
+            for task in tasks:
+                task.cancel()
+
+
+# Instancia global: comparte caché, métricas y perfiles con el scraper de Flask
+async_scraper = AsyncWebScraper(scraper)
+
+_flask_asgi = WsgiToAsgi(flask_app) if WsgiToAsgi is not None else None
+
+
+def request_header(scope, name):
+    """Valor de una cabecera de la petición ASGI (o cadena vacía)"""
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+async def send_json(send, payload, status=200, headers=None, accept_encoding=None):
+    """Envía una respuesta JSON; con `accept_encoding` (la cabecera del cliente,
+    aunque esté vacía) se comprime como en compress_response de Flask"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    headers = dict(headers or {})
+    if accept_encoding is not None:
+        headers['Vary'] = 'Accept-Encoding'
+        body, encoding = compress_body(body, accept_encoding)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        scraper.metrics.inc('scraper_response_bytes_total', len(body), encoding=encoding or 'identity')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+                   + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def start_stream(send, fmt):
+    """Inicia una respuesta en streaming; el cuerpo se envía con send_event"""
+    headers = [(b'content-type', STREAM_FORMATS[fmt].encode())]
+    headers += [(name.lower().encode(), value.encode()) for name, value in stream_headers().items()]
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+
+
+async def send_event(send, text, more_body=True):
+    await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': more_body})
+
+
+async def admit(host=None):
+    """Ocupa un hueco del control de admisión compartido con la aplicación Flask
+    
+    Si hay que esperar en la cola, la espera se hace en un hilo del executor
+    por defecto para no bloquear el loop; la cola es corta, así que nunca
+    hay muchos hilos esperando. Lanza Overloaded si se rechaza.
+    """
+    started = admission.acquire(host, block=False)
+    if started is not None:
+        return started
+
+    waiter = asyncio.get_running_loop().run_in_executor(None, admission.acquire, host)
+    try:
+        return await asyncio.shield(waiter)
+    except asyncio.CancelledError:
+        # El cliente se fue mientras esperaba: liberar el hueco si llega a entrar
+        waiter.add_done_callback(
+            lambda future: future.exception() is None and admission.release(host, future.result()))
+        raise
+
+
+async def send_overloaded(send, error):
+    """Respuesta 429 con Retry-After, igual que la de la aplicación Flask"""
+    await send_json(send, {
+        "success": False,
+        "error": "Servicio saturado, inténtelo más tarde",
+        "details": str(error),
+        "retry_after": error.retry_after
+    }, 429, headers={"Retry-After": str(error.retry_after)})
+
+
+async def read_json_body(receive):
+    """Lee el cuerpo completo de la petición y lo interpreta como JSON (o None)"""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(b''.join(chunks) or b'null')
+    except ValueError:
+        return None
+
+
+async def scrape_endpoint(scope, send):
+    """GET /scrape asíncrono"""
+    args = {key: values[0] for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+    url_to_scrape = args.get('url')
+
+    if not url_to_scrape:
+        return await send_json(send, {"error": "El parámetro 'url' es obligatorio."}, 400)
+
+    # Validar URL
+    if not scraper.is_valid_url(url_to_scrape):
+        return await send_json(send, {"error": "La URL proporcionada no es válida."}, 400)
+
+    parser = args.get('parser')
+    if parser and parser not in PARSER_BACKENDS:
+        return await send_json(send, {"error": f"Parser no soportado. Opciones: {', '.join(PARSER_BACKENDS)}"}, 400)
+
+    use_cache = args.get('cache', '1') != '0'
+    debug = args.get('debug', '0') == '1'
+    since = args.get('since')
+    only_new = args.get('only_new', '0') == '1'
+
+    try:
+        fmt = stream_format(args.get('stream'), request_header(scope, b'accept'))
+    except ValueError as e:
+        return await send_json(send, {"error": str(e)}, 400)
+
+    host = urlparse(url_to_scrape).netloc.lower()
+    try:
+        started = await admit(host)
+    except Overloaded as e:
+        return await send_overloaded(send, e)
+    try:
+        await scrape_response(scope, send, url_to_scrape, fmt, use_cache, parser, debug, since, only_new)
+    finally:
+        admission.release(host, started)
+
+
+async def scrape_response(scope, send, url_to_scrape, fmt, use_cache, parser, debug, since, only_new):
+    """Respuesta de /scrape una vez admitida la petición"""
+    if fmt:
+        await start_stream(send, fmt)
+        await send_event(send, format_event(fmt, 'start', {"url": url_to_scrape}))
+        start_time = time.time()
+        info = {}
+        try:
+            data = await async_scraper.scrape_website(url_to_scrape, info, use_cache=use_cache, parser=parser)
+            data = scraper.select_new_items(url_to_scrape, data, info, since, only_new)
+        except Exception as e:
+            return await send_event(send, scrape_error_event(fmt, url_to_scrape, e), more_body=False)
+        for event in scrape_events(fmt, url_to_scrape, data, info, debug, start_time):
+            await send_event(send, event)
+        return await send_event(send, '', more_body=False)
+
+    try:
+        start_time = time.time()
+        info = {}
+        data = await async_scraper.scrape_website(url_to_scrape, info, use_cache=use_cache, parser=parser)
+        data = scraper.select_new_items(url_to_scrape, data, info, since, only_new)
+        end_time = time.time()
+
+        # Si el cliente ya tiene estos elementos (If-None-Match) se responde 304
+        tag = items_etag(data, info.get('cursor'))
+        etag = f'W/"{tag}"'
+        if parse_etags(request_header(scope, b'if-none-match') or None).contains_weak(tag):
+            scraper.metrics.inc('scraper_not_modified_total')
+            await send({'type': 'http.response.start', 'status': 304,
+                        'headers': [(b'etag', etag.encode()), (b'vary', b'Accept-Encoding')]})
+            return await send({'type': 'http.response.body', 'body': b''})
+
+        await send_json(send, {
+            "success": True,
+            "data": data,
+            "total_items": len(data),
+            **scrape_metadata(info, debug),
+            "processing_time": round(end_time - start_time, 2),
+            "url": url_to_scrape
+        }, headers={"ETag": etag}, accept_encoding=request_header(scope, b'accept-encoding'))
+
+    except Exception as e:
+        await send_json(send, {
+            "success": False,
+            "error": "Error al procesar la página",
+            "details": str(e),
+            "url": url_to_scrape
+        }, 500)
+
+
+async def scrape_batch_endpoint(scope, receive, send):
+    """POST /scrape/batch asíncrono"""
+    payload = await read_json_body(receive)
+    if not isinstance(payload, dict):
+        payload = {}
+    urls = payload.get('urls')
+
+    if not isinstance(urls, list) or not urls:
+        return await send_json(send, {"error": "El campo 'urls' debe ser una lista no vacía."}, 400)
+
+    if len(urls) > BATCH_MAX_URLS:
+        return await send_json(send, {"error": f"Se admiten como máximo {BATCH_MAX_URLS} URLs por lote."}, 400)
+
+    invalid = [url for url in urls if not isinstance(url, str) or not scraper.is_valid_url(url)]
+    if invalid:
+        return await send_json(send, {"error": "Hay URLs no válidas en el lote.", "invalid_urls": invalid}, 400)
+
+    parser = payload.get('parser')
+    if parser and parser not in PARSER_BACKENDS:
+        return await send_json(send, {"error": f"Parser no soportado. Opciones: {', '.join(PARSER_BACKENDS)}"}, 400)
+
+    use_cache = payload.get('cache', True) is not False
+    debug = payload.get('debug') is True
+
+    since = payload.get('since')
+    if since is not None and not isinstance(since, dict):
+        return await send_json(send, {"error": "El campo 'since' debe ser un objeto URL -> cursor."}, 400)
+    only_new = payload.get('only_new') is True
+
+    try:
+        fmt = stream_format(payload.get('stream'), request_header(scope, b'accept'))
+    except ValueError as e:
+        return await send_json(send, {"error": str(e)}, 400)
+
+    try:
+        started = await admit()
+    except Overloaded as e:
+        return await send_overloaded(send, e)
+    try:
+        await scrape_batch_response(scope, send, urls, fmt, use_cache, parser, debug, since, only_new)
+    finally:
+        admission.release(None, started)
+
+
+async def scrape_batch_response(scope, send, urls, fmt, use_cache, parser, debug, since, only_new):
+    """Respuesta de /scrape/batch una vez admitida la petición"""
+    if fmt:
+        start_time = time.time()
+        failed = 0
+        await start_stream(send, fmt)
+        await send_event(send, format_event(fmt, 'start', {"total_urls": len(urls)}))
+        async for index, result in async_scraper.iter_batch(urls, use_cache=use_cache, parser=parser, debug=debug,
+                                                            since=since, only_new=only_new):
+            failed += not result["success"]
+            await send_event(send, format_event(fmt, 'result', {"index": index, **result}))
+        return await send_event(send, format_event(fmt, 'end', {
+            "success": True,
+            "total_urls": len(urls),
+            "failed_urls": failed,
+            "processing_time": round(time.time() - start_time, 2)
+        }), more_body=False)
+
+    start_time = time.time()
+    results = await async_scraper.scrape_batch(urls, use_cache=use_cache, parser=parser, debug=debug,
+                                               since=since, only_new=only_new)
+    end_time = time.time()
+
+    await send_json(send, {
+        "success": True,
+        "results": results,
+        "total_urls": len(urls),
+        "failed_urls": sum(1 for result in results if not result["success"]),
+        "processing_time": round(end_time - start_time, 2)
+    }, accept_encoding=request_header(scope, b'accept-encoding'))
+
+
+async def app(scope, receive, send):
+    """Aplicación ASGI: /scrape y /scrape/batch asíncronos, el resto con Flask"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                start_service()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_scraper.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    method = scope['method']
+
+    if path == '/scrape' and method == 'GET':
+        return await scrape_endpoint(scope, send)
+    if path == '/scrape/batch' and method == 'POST':
+        return await scrape_batch_endpoint(scope, receive, send)
+
+    if _flask_asgi is not None:
+        return await _flask_asgi(scope, receive, send)
+    return await send_json(send, {"error": "Endpoint no encontrado"}, 404)
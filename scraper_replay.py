@@ -0,0 +1,203 @@
+"""Replay: vuelve a extraer sin red las páginas guardadas en el PageStore
+
+Con SCRAPER_STORE_PATH el scraper guarda en disco cada página descargada.
+Este módulo recorre ese almacén y ejecuta la extracción actual sobre los
+cuerpos guardados, en paralelo con un pool de procesos, para ver el efecto
+de un cambio en la heurística sin volver a pedir nada a los sitios:
+
+    python scraper_replay.py list   --store DIR [--url-prefix P] [--since FECHA] [--until FECHA]
+    python scraper_replay.py replay --store DIR --out antes.jsonl [--processes N] [--all]
+    (cambiar la heurística)
+    python scraper_replay.py replay --store DIR --out despues.jsonl
+    python scraper_replay.py diff antes.jsonl despues.jsonl
+
+Por defecto solo se procesa la descarga más reciente de cada URL; con
+--all, todas. Las fechas son segundos desde epoch o fechas ISO 8601.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from scraper_api import EXTRACT_START_METHOD, DomainProfiles, PageStore, WebScraper
+
+# Un feed anunciado se usa si se guardó hasta este margen después de la página
+FEED_SLACK_SECONDS = 60
+
+# Almacén y scraper propios de cada proceso del replay
+_replay_store = None
+_replay_scraper = None
+
+
+def init_replay_worker(store_path, parser=None):
+    """Inicializa un proceso del replay (o el proceso actual si no hay pool)"""
+    global _replay_store, _replay_scraper
+    _replay_store = PageStore(store_path, max_bytes=None)
+    _replay_scraper = WebScraper(max_workers=1, parser=parser or 'html.parser', extract_processes=0,
+                                 profiles=DomainProfiles(path=None), store=False)
+
+
+def replay_fetch(fetch):
+    """Extrae de nuevo una descarga guardada y devuelve su resultado"""
+    result = {"url": fetch['url'], "fetched_at": fetch['fetched_at'], "digest": fetch['digest']}
+    body = _replay_store.get(fetch['digest'])
+    if body is None:
+        return {**result, "success": False, "error": "Cuerpo no disponible en el almacén"}
+
+    # Feeds anunciados por la página y guardados junto a ella
+    feeds = {}
+    for feed_url in _replay_scraper.find_feed_urls(body, fetch['url'])[:1]:
+        stored = _replay_store.fetches(url=feed_url, until=fetch['fetched_at'] + FEED_SLACK_SECONDS)
+        feed = _replay_store.get(stored[-1]['digest']) if stored else None
+        if feed is not None:
+            feeds[feed_url] = feed
+
+    content_type = next((value for name, value in fetch['headers'].items() if name.lower() == 'content-type'), None)
+    items, source = _replay_scraper.reextract(body, fetch['url'], feeds=feeds, content_type=content_type)
+    return {**result, "success": True, "source": source, "total_items": len(items), "items": items}
+
+
+def replay(store, fetches, parser=None, processes=0, chunksize=16):
+    """Genera el resultado de cada descarga, en el mismo orden, usando `processes` procesos"""
+    if processes <= 0:
+        init_replay_worker(store.path, parser)
+        yield from map(replay_fetch, fetches)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context(EXTRACT_START_METHOD),
+        initializer=init_replay_worker,
+        initargs=(store.path, parser),
+    ) as pool:
+        yield from pool.map(replay_fetch, fetches, chunksize=chunksize)
+
+
+def load_results(path):
+    """Resultados de un replay indexados por (URL, resumen del cuerpo)"""
+    results = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                results[(result['url'], result['digest'])] = result
+    return results
+
+
+def diff_results(before, after):
+    """Compara dos replays y devuelve un resumen y los cambios por página"""
+    summary = {"pages": 0, "identical": 0, "changed": 0, "only_before": 0, "only_after": 0}
+    changes = []
+
+    for key in sorted(before.keys() | after.keys()):
+        if key not in after:
+            summary["only_before"] += 1
+            continue
+        if key not in before:
+            summary["only_after"] += 1
+            continue
+
+        summary["pages"] += 1
+        old = [(item['title'], item['link']) for item in before[key].get('items', [])]
+        new = [(item['title'], item['link']) for item in after[key].get('items', [])]
+        if old == new and before[key].get('source') == after[key].get('source'):
+            summary["identical"] += 1
+            continue
+
+        summary["changed"] += 1
+        changes.append({
+            "url": key[0],
+            "digest": key[1],
+            "source": [before[key].get('source'), after[key].get('source')],
+            "removed": [item for item in old if item not in new],
+            "added": [item for item in new if item not in old],
+            "reordered": set(old) == set(new),
+        })
+
+    return summary, changes
+
+
+def parse_time(value):
+    """Segundos desde epoch a partir de un número o una fecha ISO 8601"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    for name in ('list', 'replay'):
+        command = commands.add_parser(name)
+        command.add_argument('--store', default=os.environ.get('SCRAPER_STORE_PATH'))
+        command.add_argument('--url-prefix')
+        command.add_argument('--since')
+        command.add_argument('--until')
+        command.add_argument('--all', action='store_true', help='todas las descargas, no solo la última de cada URL')
+
+    replay_command = commands.choices['replay']
+    replay_command.add_argument('--out', help='fichero JSONL de salida (por defecto, la salida estándar)')
+    replay_command.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    replay_command.add_argument('--parser')
+
+    diff_command = commands.add_parser('diff')
+    diff_command.add_argument('before')
+    diff_command.add_argument('after')
+    diff_command.add_argument('--json', action='store_true', help='cambios por página en JSONL')
+
+    args = parser.parse_args()
+
+    if args.command == 'diff':
+        summary, changes = diff_results(load_results(args.before), load_results(args.after))
+        for change in changes:
+            if args.json:
+                print(json.dumps(change, ensure_ascii=False))
+            else:
+                print(f"{change['url']} ({change['digest'][:12]}) fuente {change['source'][0]} -> {change['source'][1]}"
+                      + (" [solo cambia el orden]" if change['reordered'] else ""))
+                for title, link in change['removed']:
+                    print(f"  - {title} <{link}>")
+                for title, link in change['added']:
+                    print(f"  + {title} <{link}>")
+        print(json.dumps(summary), file=sys.stderr)
+        return 1 if summary["changed"] else 0
+
+    if not args.store:
+        parser.error('hay que indicar --store o SCRAPER_STORE_PATH')
+
+    store = PageStore(args.store, max_bytes=None)
+    fetches = store.fetches(url_prefix=args.url_prefix, since=parse_time(args.since),
+                            until=parse_time(args.until), latest=not args.all)
+
+    if args.command == 'list':
+        for fetch in fetches:
+            fetched_at = datetime.fromtimestamp(fetch['fetched_at']).isoformat(timespec='seconds')
+            print(f"{fetched_at}  {fetch['status']}  {fetch['digest'][:12]}  {fetch['url']}")
+        print(json.dumps(store.stats()), file=sys.stderr)
+        return 0
+
+    start = time.perf_counter()
+    out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    try:
+        for result in replay(store, fetches, args.parser, args.processes):
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if args.out:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(fetches)} páginas en {elapsed:.2f} s ({len(fetches) / max(elapsed, 1e-9):.0f} páginas/s)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())